@@ -0,0 +1,218 @@
+import atexit
+import gzip
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Literal, Optional, cast
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+CassetteMode = Literal["record", "replay"]
+
+# Query parameters that carry secrets and must not end up in a cassette
+SECRET_PARAMS = {"apikey"}
+
+# Response headers worth keeping, everything else is dropped on record
+RECORDED_HEADERS = {"content-type", "etag", "last-modified"}
+
+# Block tags whose answer moves with the chain
+MOVING_BLOCK_TAGS = {"latest", "pending", "safe", "finalized"}
+
+
+class CassetteMissError(Exception):
+    """Not a RequestException, so that `client` lets a miss stop the replay"""
+
+
+def normalize_url(url: str, params: Optional[Any] = None) -> str:
+    split = urlsplit(url)
+    query = parse_qsl(split.query, keep_blank_values=True)
+    if isinstance(params, dict):
+        query.extend((k, str(v)) for k, v in params.items())
+    query = sorted((k, v) for k, v in query if k.lower() not in SECRET_PARAMS)
+    return urlunsplit((split.scheme, split.netloc, split.path, urlencode(query), ""))
+
+
+def to_key(*parts: Any) -> str:
+    return json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def is_error(recorded: Any) -> bool:
+    """JSON-RPC response with an error, or HTTP response that is not a success"""
+    if not isinstance(recorded, dict):
+        return False
+    if "error" in recorded:
+        return True
+    if "status" not in recorded:
+        return False
+    if not 200 <= recorded["status"] < 300:
+        return True
+    # Etherscan-like APIs answer errors, e.g. rate limits, with a 200 and status "0"
+    try:
+        body = json.loads(recorded["body"])
+    except json.decoder.JSONDecodeError:
+        return False
+    return isinstance(body, dict) and body.get("status") == "0"
+
+
+def is_moving(params: Any) -> bool:
+    """JSON-RPC params asking about the chain as it is now, e.g. the "latest" block"""
+    if isinstance(params, dict):
+        params = list(params.values())
+    if isinstance(params, (list, tuple)):
+        return any(is_moving(i) for i in params)
+    return isinstance(params, str) and params in MOVING_BLOCK_TAGS
+
+
+class Cassette:
+    mode: CassetteMode
+    file_path: Path
+
+    """
+    Gzipped store of normalized request/response pairs.
+
+    While recording, requests go upstream as they would without a cassette, and the first
+    success to each of them is kept (or the last error, if none succeeded). Requests
+    about the chain as it is now (e.g. the "latest" block) and the clock are only asked
+    until they succeed: that success is served to every repeat, so a replay sees the
+    same chain and months whichever order threads ask in.
+    """
+
+    def __init__(self, file_path: Path, mode: CassetteMode):
+        self.file_path = Path(file_path)
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._interactions: dict[str, Any] = {}
+        if mode == "replay":
+            with gzip.open(self.file_path, "rt") as f:
+                self._interactions = json.load(f)
+            logger.info(
+                f"Replaying {len(self._interactions)} requests from {file_path}"
+            )
+
+    def has_success(self, key: str) -> bool:
+        with self._lock:
+            return key in self._interactions and not is_error(self._interactions[key])
+
+    def record(self, key: str, response: Any) -> Any:
+        """Keeps `response` unless a success is recorded already, returns the one kept"""
+        with self._lock:
+            if key not in self._interactions or is_error(self._interactions[key]):
+                self._interactions[key] = response
+            return self._interactions[key]
+
+    def replay(self, key: str) -> Any:
+        with self._lock:
+            if key not in self._interactions:
+                raise CassetteMissError(f"No recorded response for {key}")
+            return self._interactions[key]
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return dict(self._interactions)
+
+    def update(self, interactions: dict[str, Any]) -> None:
+        """Adds interactions recorded elsewhere, e.g. in worker processes"""
+        for key, response in interactions.items():
+            self.record(key, response)
+
+    def now(self) -> datetime:
+        """Time the recorded run started, so a replay covers the same months"""
+        key = to_key("clock")
+        if self.mode == "record":
+            return datetime.fromisoformat(
+                self.record(key, datetime.now(timezone.utc).isoformat())
+            )
+        return datetime.fromisoformat(self.replay(key))
+
+    def save(self) -> None:
+        temp_path = self.file_path.with_suffix(f"{self.file_path.suffix}.tmp")
+        with self._lock:
+            with gzip.open(temp_path, "wt") as f:
+                json.dump(self._interactions, f)
+        os.replace(temp_path, self.file_path)
+        logger.info(f"Recorded {len(self._interactions)} requests to {self.file_path}")
+
+    def request(
+        self, session: requests.Session, method: str, url: str, **kwargs
+    ) -> requests.Response:
+        key = to_key(
+            "http",
+            method,
+            normalize_url(url, kwargs.get("params")),
+            kwargs.get("json"),
+            kwargs.get("data"),
+        )
+        if self.mode == "replay":
+            return to_response(self.replay(key), url)
+
+        response = session.request(method=method, url=url, **kwargs)
+        self.record(
+            key,
+            {
+                "status": response.status_code,
+                "headers": {
+                    k: v
+                    for k, v in response.headers.items()
+                    if k.lower() in RECORDED_HEADERS
+                },
+                "body": response.text,
+            },
+        )
+        return response
+
+
+def to_response(recorded: dict[str, Any], url: str) -> requests.Response:
+    response = requests.Response()
+    response.status_code = recorded["status"]
+    response.headers = CaseInsensitiveDict(recorded["headers"])
+    response._content = recorded["body"].encode("utf-8")
+    response.encoding = "utf-8"
+    response.url = url
+    return response
+
+
+@lru_cache(maxsize=None)
+def get_cassette() -> Optional[Cassette]:
+    """Cassette configured by `CASSETTE_MODE` and `CASSETTE_PATH`, if any"""
+    mode = os.environ.get("CASSETTE_MODE")
+    if not mode:
+        return None
+    if mode not in ("record", "replay"):
+        raise ValueError(f"Invalid CASSETTE_MODE={mode}")
+    file_path = Path(os.environ.get("CASSETTE_PATH", "cassette.json.gz"))
+    cassette = Cassette(file_path, cast(CassetteMode, mode))
+    if mode == "record":
+        atexit.register(cassette.save)
+    return cassette
+
+
+def get_now() -> datetime:
+    """Current time, or the one of the recorded run when a cassette is active"""
+    cassette = get_cassette()
+    return cassette.now() if cassette else datetime.now(timezone.utc)
+
+
+def make_cassette_middleware(cassette: Cassette, name: str):
+    """Web3 middleware recording or replaying raw JSON-RPC responses under `name`"""
+
+    def cassette_middleware(make_request, w3):
+        def middleware(method, params):
+            key = to_key("rpc", name, method, params)
+            is_pinned = is_moving(params)
+            if cassette.mode == "replay" or (is_pinned and cassette.has_success(key)):
+                return cassette.replay(key)
+            response = make_request(method, params)
+            recorded = cassette.record(key, response)
+            return recorded if is_pinned else response
+
+        return middleware
+
+    return cassette_middleware
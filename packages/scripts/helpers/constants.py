@@ -1,4 +1,6 @@
+import os
 from enum import IntEnum
+from pathlib import Path
 
 
 class Network(IntEnum):
@@ -14,5 +16,24 @@ REQUESTS_STATUS_FORCELIST = [429, 500, 502, 503, 504]
 
 REQUESTS_TIMEOUT = 10  # seconds
 
+HTTP_CACHE_DIR = Path(
+    os.environ.get("HTTP_CACHE_DIR") or Path.home() / ".cache" / "ydata" / "http"
+)
+
 MAX_CALLS_PER_WINDOW = 4
 CALL_WINDOW_IN_SECOND = 2
+
+# Blocks per log query, halved whenever a provider rejects the range and doubled back
+# after each page it accepts
+GET_LOGS_BLOCK_RANGE = 500_000
+
+RPC_LATENCY_WINDOW = 100  # latest latencies kept per endpoint
+RPC_PENALTY_HALF_LIFE = 10  # seconds for the penalty of an endpoint's failures to halve
+RPC_HEDGE_MIN_DELAY = 0.2  # seconds, lower bound of the delay before hedging
+RPC_HEDGE_MAX_WORKERS = 16
+# Requests failing on every endpoint of a pool, e.g. its only one, as web3's HTTPProvider
+RPC_RETRY_TIMES = 5
+RPC_BACKOFF_FACTOR = 0.5
+# Other errors, e.g. -32005 for a log query with too many results, go back to web3
+RPC_RATE_LIMIT_ERROR_CODES = [429]
+RPC_RATE_LIMIT_MESSAGES = ["rate limit", "too many requests"]
@@ -0,0 +1,65 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+import requests
+
+# Validators sent back to the server, by the response header they come from
+VALIDATORS = {"etag": "If-None-Match", "last-modified": "If-Modified-Since"}
+
+
+class HTTPCache:
+    directory: Path
+
+    """
+    Local store of response bodies along with their ETag and Last-Modified validators,
+    so a repeated request can be revalidated and answered by a bodyless 304
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{hashlib.sha256(key.encode()).hexdigest()}.json.gz"
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            with gzip.open(path, "rt") as f:
+                return json.load(f)
+        except (OSError, EOFError, json.decoder.JSONDecodeError):
+            return None
+
+    def set(self, key: str, response: requests.Response) -> None:
+        headers = {k.lower(): v for k, v in response.headers.items()}
+        if not any(i in headers for i in VALIDATORS):
+            return
+        entry = {
+            "status": response.status_code,
+            "headers": {
+                k: v
+                for k, v in headers.items()
+                if k in VALIDATORS or k == "content-type"
+            },
+            "body": response.text,
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        with gzip.open(temp_path, "wt") as f:
+            json.dump(entry, f)
+        os.replace(temp_path, self._path(key))
+
+
+def get_conditional_headers(entry: dict[str, Any]) -> dict[str, str]:
+    return {
+        header: entry["headers"][validator]
+        for validator, header in VALIDATORS.items()
+        if validator in entry["headers"]
+    }
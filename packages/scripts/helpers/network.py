@@ -1,19 +1,24 @@
 import json
 import logging
+import threading
 import time
-from functools import wraps
+from concurrent.futures import Future
+from functools import partial, wraps
 from http import HTTPStatus
-from typing import Any, Callable, Literal, Optional, Type
+from typing import Any, Callable, Hashable, Literal, Optional, Type
 
 import requests
+from helpers.cassette import get_cassette, normalize_url, to_key, to_response
 from helpers.constants import (
     CALL_WINDOW_IN_SECOND,
+    HTTP_CACHE_DIR,
     MAX_CALLS_PER_WINDOW,
     REQUESTS_BACKOFF_FACTOR,
     REQUESTS_RETRY_TIMES,
     REQUESTS_STATUS_FORCELIST,
     REQUESTS_TIMEOUT,
 )
+from helpers.http_cache import HTTPCache, get_conditional_headers
 from requests.adapters import HTTPAdapter, Retry
 
 logging.basicConfig(
@@ -31,6 +36,8 @@ retry_strategy = Retry(
 
 session = requests.Session()
 
+http_cache = HTTPCache(HTTP_CACHE_DIR)
+
 adapter = HTTPAdapter(max_retries=retry_strategy)
 
 session.mount("https://", adapter)
@@ -43,12 +50,31 @@ def client(
     **kwargs,
 ) -> Optional[requests.Response]:
     try:
-        response = session.request(
+        cassette = get_cassette()
+        send: Callable[..., requests.Response] = session.request
+        if cassette:
+            send = partial(cassette.request, session)
+
+        # Cassettes hold full bodies, so requests are only revalidated without one
+        is_cacheable = method == "get" and not cassette
+        cache_key = to_key(method, normalize_url(url, kwargs.get("params")))
+        cached = http_cache.get(cache_key) if is_cacheable else None
+        if cached:
+            kwargs["headers"] = {
+                **get_conditional_headers(cached),
+                **kwargs.get("headers", {}),
+            }
+
+        response = send(
             method=method.upper(),
             url=url,
             timeout=REQUESTS_TIMEOUT,
             **kwargs,
         )
+        if cached and response.status_code == HTTPStatus.NOT_MODIFIED:
+            response = to_response(cached, url)
+        elif is_cacheable and response.status_code == HTTPStatus.OK:
+            http_cache.set(cache_key, response)
         response.raise_for_status()
         return response
     except requests.exceptions.HTTPError as err_http:
@@ -116,6 +142,7 @@ def rate_limit(
 ) -> Callable:
     def decorator(fn: Callable) -> Callable:
         calls: list[float] = []
+        lock = threading.Lock()
 
         @wraps(fn)
         def wrapper(*args: Any, **kwargs: Any) -> Any:
@@ -134,12 +161,58 @@ def rate_limit(
                 nonlocal calls
                 calls = [*calls, time.time()][-max_calls_per_window:]
 
-            is_over_limit, sleep_time = check_is_over_limit()
-            if is_over_limit:
-                time.sleep(sleep_time or 0)
-            add_to_limit()
+            # Replayed responses never reach the rate-limited endpoint
+            cassette = get_cassette()
+            if cassette and cassette.mode == "replay":
+                return fn(*args, **kwargs)
+
+            # Concurrent callers take their slot in the window one at a time
+            with lock:
+                is_over_limit, sleep_time = check_is_over_limit()
+                if is_over_limit:
+                    time.sleep(sleep_time or 0)
+                add_to_limit()
             return fn(*args, **kwargs)
 
         return wrapper
 
     return decorator
+
+
+def single_flight(key: Optional[Callable[..., Hashable]] = None) -> Callable:
+    """
+    Concurrent calls with the same key share a single call of `fn`, whose result or
+    error is handed to each of them. Nothing is kept once the call is over.
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        lock = threading.Lock()
+        in_flight: dict[Hashable, Future] = {}
+
+        @wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            call_key = (
+                key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+            )
+            with lock:
+                future = in_flight.get(call_key)
+                is_leader = future is None
+                if future is None:
+                    future = in_flight[call_key] = Future()
+            if not is_leader:
+                return future.result()
+
+            try:
+                result = fn(*args, **kwargs)
+                future.set_result(result)
+                return result
+            except BaseException as e:
+                future.set_exception(e)
+                raise e
+            finally:
+                with lock:
+                    del in_flight[call_key]
+
+        return wrapper
+
+    return decorator
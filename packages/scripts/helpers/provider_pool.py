@@ -0,0 +1,199 @@
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Optional
+
+import requests
+from helpers.constants import (
+    REQUESTS_TIMEOUT,
+    RPC_BACKOFF_FACTOR,
+    RPC_HEDGE_MAX_WORKERS,
+    RPC_HEDGE_MIN_DELAY,
+    RPC_LATENCY_WINDOW,
+    RPC_PENALTY_HALF_LIFE,
+    RPC_RATE_LIMIT_ERROR_CODES,
+    RPC_RATE_LIMIT_MESSAGES,
+    RPC_RETRY_TIMES,
+)
+from helpers.network import get_backoff_time
+from web3 import HTTPProvider
+from web3.middleware.exception_retry_request import check_if_retry_on_failure
+from web3.providers import BaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=RPC_HEDGE_MAX_WORKERS, thread_name_prefix="rpc-hedge"
+)
+
+# Errors retried by the middleware of web3's HTTPProvider, bypassed by the endpoints
+RETRIED_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.HTTPError,
+    requests.exceptions.Timeout,
+    requests.exceptions.TooManyRedirects,
+)
+
+
+class RateLimitedError(Exception):
+    pass
+
+
+def is_rate_limited(response: RPCResponse) -> bool:
+    error = response.get("error")
+    if not isinstance(error, dict):
+        return False
+    message = str(error.get("message", "")).lower()
+    return error.get("code") in RPC_RATE_LIMIT_ERROR_CODES or any(
+        i in message for i in RPC_RATE_LIMIT_MESSAGES
+    )
+
+
+class Endpoint:
+    url: str
+    provider: HTTPProvider
+
+    """
+    Single node of a pool, scored on its recent latencies and failures
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.provider = HTTPProvider(url, request_kwargs={"timeout": REQUESTS_TIMEOUT})
+        self._lock = threading.Lock()
+        self._latencies: deque[float] = deque(maxlen=RPC_LATENCY_WINDOW)
+        self._penalty = 0.0
+        self._penalized_at = 0.0
+
+    def _get_penalty(self) -> float:
+        elapsed = time.monotonic() - self._penalized_at
+        return self._penalty * 0.5 ** (elapsed / RPC_PENALTY_HALF_LIFE)
+
+    def record(self, is_success: bool, latency: float = 0) -> None:
+        """Each failure adds a penalty worth a timed out request, which decays over time"""
+        with self._lock:
+            if is_success:
+                self._latencies.append(latency)
+                return
+            self._penalty = self._get_penalty() + 1
+            self._penalized_at = time.monotonic()
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        return latencies[min(int(q * len(latencies)), len(latencies) - 1)]
+
+    @property
+    def score(self) -> float:
+        """
+        Expected latency plus the penalty of recent failures, lower is better. Endpoints
+        never measured come first, and a failing endpoint is tried again once its penalty
+        has decayed below the latency of the others
+        """
+        with self._lock:
+            latency = statistics.median(self._latencies) if self._latencies else 0
+            return latency + REQUESTS_TIMEOUT * self._get_penalty()
+
+    def request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        start = time.monotonic()
+        try:
+            response = self.provider.make_request(method, params)
+        except Exception as e:
+            self.record(False)
+            raise e
+        if is_rate_limited(response):
+            self.record(False)
+            raise RateLimitedError(f"{self.url} is rate limited: {response['error']}")
+        self.record(True, time.monotonic() - start)
+        return response
+
+
+class ProviderPool(BaseProvider):
+    endpoints: list[Endpoint]
+    hedge: bool
+
+    """
+    Web3 provider routing each request to the best scored of several endpoints of the
+    same network, failing over to the next ones. With `hedge`, a duplicate request is
+    sent to the second best endpoint once the first one is slower than its p95 latency,
+    and whichever answers first wins.
+    """
+
+    def __init__(self, urls: list[str], hedge: bool = False):
+        if not urls:
+            raise ValueError("At least one endpoint is required")
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.hedge = hedge
+
+    def ranked(self) -> list[Endpoint]:
+        return sorted(self.endpoints, key=lambda i: i.score)
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        """
+        A request failing on every endpoint for a transport error is retried with a
+        backoff, for the methods web3's HTTPProvider retries
+        """
+        retries = RPC_RETRY_TIMES if check_if_retry_on_failure(method) else 0
+        call_count = 0
+        while True:
+            endpoints = self.ranked()
+            try:
+                if self.hedge and len(endpoints) > 1:
+                    return self.hedged_request(endpoints, method, params)
+                return self.failover_request(endpoints, method, params)
+            except RETRIED_ERRORS as e:
+                if call_count >= retries:
+                    raise e
+                call_count += 1
+                backoff_time = get_backoff_time(call_count, RPC_BACKOFF_FACTOR)
+                logger.warning(
+                    f"{method} failed on every endpoint: {e}; "
+                    f"Retrying in {backoff_time} seconds ({call_count}/{retries})"
+                )
+                time.sleep(backoff_time)
+
+    def failover_request(
+        self, endpoints: list[Endpoint], method: RPCEndpoint, params: Any
+    ) -> RPCResponse:
+        error: Optional[Exception] = None
+        for endpoint in endpoints:
+            try:
+                return endpoint.request(method, params)
+            except Exception as e:
+                logger.warning(f"{method} failed on {endpoint.url}: {e}")
+                error = e
+        raise error or ValueError(f"No endpoint answered {method}")
+
+    def hedged_request(
+        self, endpoints: list[Endpoint], method: RPCEndpoint, params: Any
+    ) -> RPCResponse:
+        primary, secondary, *others = endpoints
+        delay = max(primary.quantile(0.95) or 0, RPC_HEDGE_MIN_DELAY)
+        futures: list[Future] = [executor.submit(primary.request, method, params)]
+
+        done, _ = wait(futures, timeout=delay)
+        if not done or futures[0].exception() is not None:
+            futures.append(executor.submit(secondary.request, method, params))
+
+        error: Optional[BaseException] = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+                logger.warning(f"{method} failed on a hedged endpoint: {error}")
+
+        if others:
+            return self.failover_request(others, method, params)
+        raise error or ValueError(f"No endpoint answered {method}")
+
+    def isConnected(self) -> bool:
+        return any(i.provider.isConnected() for i in self.endpoints)
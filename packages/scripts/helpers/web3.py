@@ -4,8 +4,10 @@ import os
 from json.decoder import JSONDecodeError
 from typing import Literal, Optional, Union
 
+from helpers.cassette import get_cassette, make_cassette_middleware, to_key
 from helpers.constants import Network
-from helpers.network import client, parse_json, rate_limit, retry
+from helpers.network import client, parse_json, rate_limit, retry, single_flight
+from helpers.provider_pool import ProviderPool
 from web3 import Web3
 from web3.contract import Contract
 from web3.exceptions import ContractLogicError
@@ -14,6 +16,16 @@ from web3.middleware import geth_poa_middleware
 logger = logging.getLogger(__name__)
 
 
+def single_flight_middleware(make_request, w3):
+    """Identical JSON-RPC requests in flight at the same time go out only once"""
+
+    @single_flight(key=lambda method, params: to_key(method, params))
+    def middleware(method, params):
+        return make_request(method, params)
+
+    return middleware
+
+
 class Web3Provider:
     chain_id: Network
     endpoint: str
@@ -52,10 +64,24 @@ class Web3Provider:
             )
             self.oracle = "0x043518ab266485dc085a1db095b8d9c2fc78e9b9"
 
-        self.provider = Web3(Web3.HTTPProvider(provider))
+        # Several endpoints of the network may be given, separated by commas
+        urls = [i.strip() for i in provider.split(",") if i.strip()]
+        hedge = os.environ.get("RPC_HEDGE", "").lower() in ("1", "true")
+        self.provider = Web3(ProviderPool(urls, hedge=hedge))
         if network == Network.Optimism:
             self.provider.middleware_onion.inject(geth_poa_middleware, layer=0)
+        self.provider.middleware_onion.inject(
+            single_flight_middleware, name="single_flight", layer=0
+        )
+        if cassette := get_cassette():
+            # Innermost, so raw provider responses are what gets recorded
+            self.provider.middleware_onion.inject(
+                make_cassette_middleware(cassette, network.name),
+                name="cassette",
+                layer=0,
+            )
 
+    @single_flight(key=lambda self, address: (self.chain_id, address.lower()))
     @rate_limit()
     def fetch_abi(self, address: str) -> list[dict]:
         address = Web3.toChecksumAddress(address)
@@ -1,5 +1,11 @@
+import argparse
 import json
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
+from itertools import repeat
 from pathlib import Path
 from typing import Any, Callable, Optional, Union
 
@@ -10,14 +16,20 @@ from expressions import (
     gen_total_debt_expr,
     gen_total_gains_expr,
 )
+from helpers.cassette import get_cassette, get_now
 from helpers.constants import Network
 from helpers.network import client
 from helpers.web3 import Web3Provider
 from process_yearn_vision.typings import (
+    MonthRow,
     NetworkStr,
     QueryResult,
     QueryResultMap,
+    RecomputedVault,
+    Series,
+    Vault,
     VaultInfo,
+    VaultTask,
 )
 from process_yearn_vision.utils.common import (
     add_months,
@@ -25,8 +37,14 @@ from process_yearn_vision.utils.common import (
     get_csv_row,
     get_start_and_end_of_month,
     to_timestamp,
-    update_csv,
+    upsert_csv_rows,
 )
+from process_yearn_vision.utils.events import cross_check, get_report_series
+from process_yearn_vision.utils.journal import RunJournal
+from process_yearn_vision.utils.metrics import upsert_metrics_csv
+from process_yearn_vision.utils.pipeline import PipelineStage, run_pipeline
+from process_yearn_vision.utils.strategy_index import StrategyIndex
+from process_yearn_vision.utils.transforms import TransformStage, apply_transforms
 from process_yearn_vision.utils.yearn import (
     get_delegated_assets,
     get_vault,
@@ -34,6 +52,13 @@ from process_yearn_vision.utils.yearn import (
 )
 
 CSV_DATE_FORMAT = "%b/%y"
+FIRST_MONTH = datetime(2020, 12, 1, tzinfo=timezone.utc)
+
+PIPELINE_QUEUE_SIZE = 8
+FETCH_WORKERS = 2
+ENRICH_WORKERS = 4
+
+logger = logging.getLogger(__name__)
 
 network_mapping = {
     NetworkStr.Mainnet: Network.Mainnet,
@@ -41,62 +66,41 @@ network_mapping = {
 }
 
 
-def make_update_cum_share_price_cb() -> Callable[[int, list[str]], list]:
-    name_index: Optional[int] = None
-    price_index: Optional[int] = None
-    cum_price_index: Optional[int] = None
-    cum_price_dict: dict[str, float] = {}
-
-    def update_cum_share_price_cb(line_num: int, row: list[str]) -> list:
-        nonlocal name_index
-        nonlocal price_index
-        nonlocal cum_price_index
-        nonlocal cum_price_dict
-
-        if line_num == 0:
-            name_index = row.index("Vault")
-            price_index = row.index("Month Return (%)")
-            cum_price_index = row.index("Cumulative Return (%)")
-        else:
-            if name_index is None or price_index is None or cum_price_index is None:
-                raise ValueError("Header indexes not found")
-            name = row[name_index or 0]
-            price = float(row[price_index])
-            cum_price = cum_price_dict.get(name)
-            cum_price_dict[name] = (
-                price if cum_price is None else (1 + cum_price) * (1 + price) - 1
-            )
-            row[cum_price_index] = str(cum_price_dict[name])
-        return row
-
-    return update_cum_share_price_cb
+def make_cum_share_price_stage() -> TransformStage:
+    def update_cum_share_price(batch: pd.DataFrame) -> pd.DataFrame:
+        price = batch["Month Return (%)"]
+        cum_price = (1 + price).groupby(batch["Vault"], sort=False).cumprod() - 1
+        # First month of each vault is its own return, as in the running product
+        is_first = ~batch["Vault"].duplicated()
+        cum_price[is_first] = price[is_first]
+        return pd.DataFrame({"Cumulative Return (%)": cum_price})
+
+    return TransformStage(
+        "cum_share_price",
+        reads={"Vault": "str", "Month Return (%)": "float64"},
+        writes=["Cumulative Return (%)"],
+        fn=update_cum_share_price,
+    )
 
 
-def make_update_asset_type_cb(
-    vault_info_file_path: Path,
-) -> Callable[[int, list[str]], list]:
+def make_asset_type_stage(vault_info_file_path: Path) -> TransformStage:
     vault_info: dict[str, VaultInfo]
     with open(vault_info_file_path, "r") as f:
         vault_info = json.load(f)
-    name_index: Optional[int] = None
-    type_index: Optional[int] = None
-
-    def update_asset_type_cb(line_num: int, row: list[str]) -> list:
-        nonlocal name_index
-        nonlocal type_index
+    asset_types = {
+        name: info.get("assetType", "Other") for name, info in vault_info.items()
+    }
 
-        if line_num == 0:
-            name_index = row.index("Vault")
-            type_index = row.index("Type")
-        else:
-            if name_index is None or type_index is None:
-                raise ValueError("Header indexes not found")
-            name = row[name_index]
-            asset_type = vault_info.get(name, {}).get("assetType", "Other")
-            row[type_index] = asset_type
-        return row
+    def update_asset_type(batch: pd.DataFrame) -> pd.DataFrame:
+        asset_type = batch["Vault"].map(asset_types).fillna("Other")
+        return pd.DataFrame({"Type": asset_type})
 
-    return update_asset_type_cb
+    return TransformStage(
+        "asset_type",
+        reads={"Vault": "str"},
+        writes=["Type"],
+        fn=update_asset_type,
+    )
 
 
 def get_aum_size(aum: Union[int, float]) -> str:
@@ -109,30 +113,54 @@ def get_aum_size(aum: Union[int, float]) -> str:
     return ""
 
 
-def parse_data_and_append_csv(
-    parsed_query_results: list[dict[str, QueryResultMap]],
-    dates: list[tuple[pd.Timestamp, pd.Timestamp]],
-    output_file_path: Path,
-) -> None:
-    arr = []
-    for month_start, month_end in dates:
-        month_start_ts = to_timestamp(month_start.to_pydatetime())
-        month_end_ts = to_timestamp(month_end.to_pydatetime())
+def to_csv_row(task: VaultTask, month: MonthRow, debt: float, gains: float) -> list:
+    row = []
+    row.append(task["name"])  # Vault
+    row.append(task["network"])  # Chain
+    row.append("Other")  # Type
+    row.append(month["month"])  # Month
+    row.append(f"{month['price']}")  # Month Return (%)
+    row.append(f"{0}")  # Cumulative Return (%)
+    row.append(f"{month['aum']}")  # AUM ($)
+    row.append(get_aum_size(month["aum"]))  # AUM Size
+    row.append(f"{debt}")  # Total Debt
+    row.append(f"{gains}")  # Total Gains
+    return row
+
+
+def get_series(query_result_maps: dict[str, QueryResultMap], name: str) -> Series:
+    query_result_map = query_result_maps.get(name)
+    return query_result_map["values"] if query_result_map else {}
 
-        price_data = parsed_query_results[0]
-        aum_data = parsed_query_results[1]
-        debt_data = parsed_query_results[2]
-        gains_data = parsed_query_results[3]
 
-        for name, price_query_result_map in price_data.items():
-            network_str = price_query_result_map["network"]
-            address = price_query_result_map["address"]
-            price_values = price_query_result_map["values"]
-            aum_values = aum_data.get(name, {}).get("values", {})
-            debt_values = debt_data.get(name, {}).get("values", {})
-            gains_values = gains_data.get(name, {}).get("values", {})
+def make_fetch_stage(
+    start_dt: datetime, end_dt: datetime, journal: RunJournal
+) -> Callable[[VaultTask], VaultTask]:
+    exprs = [gen_total_gains_expr]
 
-            price = 0
+    def fetch(task: VaultTask) -> VaultTask:
+        # Strategy-level queries parsed to vault-level results
+        strategy_query_results = parse_strategy_query_results(
+            fetch_strategy_exprs(exprs, [task["name"]], start_dt, end_dt, journal)
+        )
+        for query_result_map in strategy_query_results:
+            task["values"].append(get_series(query_result_map, task["name"]))
+        return task
+
+    return fetch
+
+
+def make_parse_stage(
+    dates: list[tuple[pd.Timestamp, pd.Timestamp]], journal: RunJournal
+) -> Callable[[VaultTask], VaultTask]:
+    def parse(task: VaultTask) -> VaultTask:
+        price_values, aum_values, debt_values, gains_values = task["values"]
+        for month_start, month_end in dates:
+            month_start_ts = to_timestamp(month_start.to_pydatetime())
+            month_end_ts = to_timestamp(month_end.to_pydatetime())
+            key = f"{task['name']}|{month_end_ts}"
+
+            price: float = 0
             price_start = price_values.get(month_start_ts)
             price_end = price_values.get(month_end_ts)
             if price_start is not None and price_end is not None:
@@ -142,33 +170,202 @@ def parse_data_and_append_csv(
             if aum_end := aum_values.get(month_end_ts):
                 aum = aum_end
 
-            debt = 0
-            if debt_end := debt_values.get(month_end_ts):
-                network_int = network_mapping[network_str]
-                vault = get_vault(address, network_int)
-                w3 = Web3Provider(network_int)
-                block = timestamp_to_block(w3, month_end_ts // 10**3)
-                delegated_assets = get_delegated_assets(w3, vault, block)
-                debt = max(debt_end - delegated_assets, 0)
+            journaled_row = journal.get_row(key)
+            task["months"].append(
+                {
+                    "key": key,
+                    "month": f"{month_end.strftime(CSV_DATE_FORMAT).lower()}",
+                    "month_end_ts": month_end_ts,
+                    "price": price,
+                    "aum": aum,
+                    "debt_end": debt_values.get(month_end_ts),
+                    "gains_end": gains_values.get(month_end_ts),
+                    "row": journaled_row,
+                    "is_journaled": journaled_row is not None,
+                }
+            )
+        return task
+
+    return parse
+
 
-            gains = 0
-            if gains_end := gains_values.get(month_end_ts):
+def make_enrich_stage(
+    dates: list[tuple[pd.Timestamp, pd.Timestamp]],
+    strategy_index: StrategyIndex,
+    use_event_logs: bool = False,
+) -> Callable[[VaultTask], VaultTask]:
+    lock = threading.Lock()
+    w3s: dict[Network, Web3Provider] = {}
+    month_end_blocks: dict[tuple[Network, int], int] = {}
+
+    def get_w3(network: Network) -> Web3Provider:
+        with lock:
+            if network not in w3s:
+                w3s[network] = Web3Provider(network)
+            return w3s[network]
+
+    def get_month_end_block(network: Network, month_end_ts: int) -> int:
+        key = (network, month_end_ts)
+        with lock:
+            if key in month_end_blocks:
+                return month_end_blocks[key]
+        block = timestamp_to_block(get_w3(network), month_end_ts // 10**3)
+        with lock:
+            month_end_blocks[key] = block
+        return block
+
+    def enrich(task: VaultTask) -> VaultTask:
+        pending = [i for i in task["months"] if i["row"] is None]
+        if not pending:
+            return task
+
+        network_int = network_mapping[task["network"]]
+        w3 = get_w3(network_int)
+        vault: Optional[Vault] = None
+        if use_event_logs or any(i["debt_end"] for i in pending):
+            vault = get_vault(task["address"], network_int)
+            if vault is None:
+                raise ValueError(f"Failed to fetch vault {task['name']}")
+
+        series: dict[int, tuple[float, float]] = {}
+        if use_event_logs and vault:
+            blocks = [
+                get_month_end_block(network_int, to_timestamp(end.to_pydatetime()))
+                for _, end in dates
+            ]
+            series = get_report_series(
+                w3, task["address"], vault["token"]["decimals"], blocks
+            )
+
+        for month in pending:
+            debt: float = 0
+            gains: float = 0
+            debt_end = month["debt_end"]
+            if use_event_logs and vault:
+                block = get_month_end_block(network_int, month["month_end_ts"])
+                # Withdrawals repay debt without any event, so logs only check it
+                debt_logs, gains = series[block]
+                cross_check(task["name"], "debt", debt_logs, debt_end)
+                cross_check(task["name"], "gains", gains, month["gains_end"])
+            elif gains_end := month["gains_end"]:
                 gains = gains_end
 
-            row = []
-            row.append(name)  # Vault
-            row.append(network_str)  # Chain
-            row.append("Other")  # Type
-            row.append(f"{month_end.strftime(CSV_DATE_FORMAT).lower()}")  # Month
-            row.append(f"{price}")  # Month Return (%)
-            row.append(f"{0}")  # Cumulative Return (%)
-            row.append(f"{aum}")  # AUM ($)
-            row.append(get_aum_size(aum))  # AUM Size
-            row.append(f"{debt}")  # Total Debt
-            row.append(f"{gains}")  # Total Gains
-            arr.append(row)
+            if debt_end and vault:
+                block = get_month_end_block(network_int, month["month_end_ts"])
+                delegated_assets = get_delegated_assets(
+                    w3, vault, block, strategy_index
+                )
+                debt = max(debt_end - delegated_assets, 0)
+
+            month["row"] = to_csv_row(task, month, debt, gains)
+        return task
+
+    return enrich
+
+
+def make_write_stage(journal: RunJournal) -> Callable[[VaultTask], VaultTask]:
+    def write(task: VaultTask) -> VaultTask:
+        for month in task["months"]:
+            if not month["is_journaled"] and month["row"] is not None:
+                journal.add_row(month["key"], month["row"])
+                month["is_journaled"] = True
+        # Rows are kept by the journal until they are appended, drop the rest
+        task["values"] = []
+        task["months"] = []
+        return task
+
+    return write
+
+
+def to_vault_tasks(
+    vault_query_results: list[dict[str, QueryResultMap]], names: list[str]
+) -> list[VaultTask]:
+    price_data, aum_data, debt_data = vault_query_results
+    return [
+        {
+            "name": name,
+            "network": price_data[name]["network"],
+            "address": price_data[name]["address"],
+            "values": [
+                price_data[name]["values"],
+                get_series(aum_data, name),
+                get_series(debt_data, name),
+            ],
+            "months": [],
+        }
+        for name in names
+    ]
+
+
+def recompute_vault(
+    task: VaultTask,
+    dates: list[tuple[pd.Timestamp, pd.Timestamp]],
+    start_dt: datetime,
+    end_dt: datetime,
+    strategy_index_file_path: Path,
+    use_event_logs: bool = False,
+) -> RecomputedVault:
+    """
+    Runs every stage for a single vault, in a worker process of its own. What the worker
+    looked up or recorded is handed back, for the parent process to save once
+    """
+    journal = RunJournal(None, task["name"])
+    strategy_index = StrategyIndex(strategy_index_file_path)
+    stages = [
+        make_fetch_stage(start_dt, end_dt, journal),
+        make_parse_stage(dates, journal),
+        make_enrich_stage(dates, strategy_index, use_event_logs),
+    ]
+    for stage in stages:
+        task = stage(task)
+
+    cassette = get_cassette()
+    return {
+        "rows": [month["row"] for month in task["months"] if month["row"] is not None],
+        "strategy_index": strategy_index.to_dict(),
+        "interactions": (
+            cassette.to_dict() if cassette and cassette.mode == "record" else {}
+        ),
+    }
+
+
+def parse_data_into_rows(
+    vault_query_results: list[dict[str, QueryResultMap]],
+    dates: list[tuple[pd.Timestamp, pd.Timestamp]],
+    start_dt: datetime,
+    end_dt: datetime,
+    journal: RunJournal,
+    strategy_index: StrategyIndex,
+    use_event_logs: bool = False,
+    enrich_workers: int = ENRICH_WORKERS,
+) -> list[list[str]]:
+    names = list(vault_query_results[0].keys())
+    tasks = to_vault_tasks(vault_query_results, names)
+
+    # Each vault moves on to the next stage as soon as its inputs are ready
+    stages = [
+        PipelineStage(
+            "fetch", make_fetch_stage(start_dt, end_dt, journal), FETCH_WORKERS
+        ),
+        PipelineStage("parse", make_parse_stage(dates, journal), 1),
+        PipelineStage(
+            "enrich",
+            make_enrich_stage(dates, strategy_index, use_event_logs),
+            enrich_workers,
+        ),
+        PipelineStage("write", make_write_stage(journal), 1),
+    ]
+    run_pipeline(tasks, stages, PIPELINE_QUEUE_SIZE)
 
-    append_csv_rows(output_file_path, arr)
+    arr = []
+    for _, month_end in dates:
+        month_end_ts = to_timestamp(month_end.to_pydatetime())
+        for name in names:
+            row = journal.get_row(f"{name}|{month_end_ts}")
+            if row is None:
+                raise ValueError(f"Missing row for {name} at {month_end_ts}")
+            arr.append(row)
+    return arr
 
 
 def merge_query_result_map(
@@ -213,40 +410,57 @@ def parse_query_results(
     return arr
 
 
-def parse_strategy_exprs(
+def parse_strategy_query_results(
+    query_results: list[list[QueryResult]],
+) -> list[dict[str, QueryResultMap]]:
+    merged_arr: list[dict[str, QueryResultMap]] = []
+    for expr_query_results in query_results:
+        parsed_query_results = parse_query_results(expr_query_results)
+        merged_query_result_map = merge_query_result_map(parsed_query_results)
+        merged_arr.append(merged_query_result_map)
+    return merged_arr
+
+
+def fetch_strategy_exprs(
     gen_expr_cbs: list[Callable[[str], dict[NetworkStr, str]]],
     vaults: list[str],
     start_dt: datetime,
     end_dt: datetime,
-) -> list[dict[str, QueryResultMap]]:
-    merged_arr: list[dict[str, QueryResultMap]] = []
+    journal: RunJournal,
+) -> list[list[QueryResult]]:
+    arr: list[list[QueryResult]] = []
     vault_networks = list(map(lambda i: i.split(" - "), vaults))
     for gen_expr_cb in gen_expr_cbs:
-        arr: list[Optional[QueryResult]] = []
+        expr_arr: list[Optional[QueryResult]] = []
 
         for vault, _ in vault_networks:
             expr = gen_expr_cb(vault)
-            data = fetch_yearn_vision(expr, start_dt, end_dt)
-            arr.append(data)
-        filtered: list[QueryResult] = list(filter(lambda i: i is not None, arr))
-        parsed_query_results = parse_query_results(filtered)
-        merged_query_result_map = merge_query_result_map(parsed_query_results)
-        merged_arr.append(merged_query_result_map)
-    return merged_arr
+            data = journal.stage(
+                f"{gen_expr_cb.__name__}:{vault}",
+                lambda: fetch_yearn_vision(expr, start_dt, end_dt),
+            )
+            expr_arr.append(data)
+        filtered: list[QueryResult] = list(filter(lambda i: i is not None, expr_arr))
+        arr.append(filtered)
+    return arr
 
 
-def parse_vault_exprs(
+def fetch_vault_exprs(
     gen_expr_cbs: list[Callable[[], dict[NetworkStr, str]]],
     start_dt: datetime,
     end_dt: datetime,
-) -> list[dict[str, QueryResultMap]]:
+    journal: RunJournal,
+) -> list[QueryResult]:
     arr: list[Optional[QueryResult]] = []
     for gen_expr_cb in gen_expr_cbs:
         expr = gen_expr_cb()
-        data = fetch_yearn_vision(expr, start_dt, end_dt)
+        data = journal.stage(
+            gen_expr_cb.__name__,
+            lambda: fetch_yearn_vision(expr, start_dt, end_dt),
+        )
         arr.append(data)
     filtered: list[QueryResult] = list(filter(lambda i: i is not None, arr))
-    return parse_query_results(filtered)
+    return filtered
 
 
 def gen_json_body(
@@ -311,37 +525,214 @@ def get_start_datetime(output_file_path: Path) -> datetime:
         naive_dt = datetime.strptime(last_row[date_index], CSV_DATE_FORMAT)
         return add_months(naive_dt.replace(tzinfo=timezone.utc), 1)
     except ValueError:
-        return datetime.strptime("01/12/2020", "%d/%m/%Y").replace(tzinfo=timezone.utc)
+        return FIRST_MONTH
+
+
+def parse_month(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m").replace(tzinfo=timezone.utc)
+
+
+def parse_count(value: str) -> int:
+    count = int(value)
+    if count < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not at least 1")
+    return count
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Process yearn.vision data into output.csv. Without a selection, "
+        "every month after the last one in output.csv is appended."
+    )
+    parser.add_argument(
+        "--vaults",
+        nargs="+",
+        help='vaults to recompute, e.g. "yvDAI 0.4.3" or "yvDAI 0.4.3 - ETH"',
+    )
+    parser.add_argument(
+        "--networks",
+        nargs="+",
+        choices=[i.value for i in NetworkStr],
+        help="networks to recompute",
+    )
+    parser.add_argument(
+        "--from",
+        dest="from_month",
+        type=parse_month,
+        help="first month to recompute, as YYYY-MM",
+    )
+    parser.add_argument(
+        "--to",
+        dest="to_month",
+        type=parse_month,
+        help="last month to recompute, as YYYY-MM (default and at most the last "
+        "month of output.csv)",
+    )
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        default=Path(__file__).parent.resolve(),
+        help="directory of output.csv, metrics.csv, vault_info.json and the state "
+        "kept between runs (default: the directory of this script)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=parse_count,
+        default=1,
+        help="processes recomputing a selection, one vault at a time each (default 1). "
+        "Each process has its own rate limit",
+    )
+    parser.add_argument(
+        "--workers",
+        type=parse_count,
+        default=ENRICH_WORKERS,
+        help="threads enriching new months with on-chain data when no selection is "
+        f"given (default {ENRICH_WORKERS})",
+    )
+    return parser.parse_args(argv)
+
+
+def is_selected(name: str, network: str, args: argparse.Namespace) -> bool:
+    if args.networks and network not in args.networks:
+        return False
+    if args.vaults and name not in args.vaults:
+        return name.split(" - ")[0] in args.vaults
+    return True
+
+
+def recompute_selection(
+    args: argparse.Namespace,
+    output_file_path: Path,
+    metrics_file_path: Path,
+    strategy_index_file_path: Path,
+) -> None:
+    # Months after the last one in the csv file are left to the next run, which starts
+    # from that last month and would skip them for the vaults not selected
+    next_dt = get_start_datetime(output_file_path)
+    start_dt = args.from_month or FIRST_MONTH
+    end_dt = min(add_months(args.to_month, 1), next_dt) if args.to_month else next_dt
+    end_dt = min(end_dt, get_now())
+    dates = get_start_and_end_of_month(start_dt, end_dt)
+    if not dates:
+        logger.warning("No month of output.csv matches the selection")
+        return
+
+    exprs = [gen_share_price_expr, gen_aum_expr, gen_total_debt_expr]
+    vault_query_results = parse_query_results(
+        fetch_vault_exprs(exprs, start_dt, end_dt, RunJournal(None, ""))
+    )
+    price_data = vault_query_results[0]
+    names = [
+        name
+        for name, price_query_result_map in price_data.items()
+        if is_selected(name, price_query_result_map["network"], args)
+    ]
+    if not names:
+        logger.warning("No vault matches the selection")
+        return
+
+    # Every vault is a slice, recomputed in a process of the pool
+    tasks = to_vault_tasks(vault_query_results, names)
+    strategy_index = StrategyIndex(strategy_index_file_path)
+    cassette = get_cassette()
+    rows: list[list[str]] = []
+    with ProcessPoolExecutor(max_workers=args.processes) as executor:
+        results = executor.map(
+            recompute_vault,
+            tasks,
+            repeat(dates),
+            repeat(start_dt),
+            repeat(end_dt),
+            repeat(strategy_index_file_path),
+            repeat(os.environ.get("GAINS_ENGINE") == "logs"),
+        )
+        # Workers neither save at exit nor share files, the parent keeps their work
+        for result in results:
+            rows.extend(result["rows"])
+            strategy_index.update(result["strategy_index"])
+            if cassette:
+                cassette.update(result["interactions"])
+    strategy_index.save()
+    logger.info(f"Recomputed {len(rows)} rows of {len(names)} vaults")
+
+    key_columns = ["Vault", "Month"]
+    upsert_csv_rows(output_file_path, rows, key_columns, "Month", CSV_DATE_FORMAT)
+    upsert_metrics_csv(
+        {name: price_data[name] for name in names},
+        dates,
+        metrics_file_path,
+        CSV_DATE_FORMAT,
+    )
 
 
-def main() -> None:
-    file_dir = Path(__file__).parent.resolve()
+def main(argv: Optional[list[str]] = None) -> None:
+    args = parse_args(argv)
+    file_dir = args.data_dir
     output_file_path = file_dir / "output.csv"
     vault_info_file_path = file_dir / "vault_info.json"
+    journal_file_path = file_dir / "journal.jsonl"
+    strategy_index_file_path = file_dir / "strategy_index.json"
+    metrics_file_path = file_dir / "metrics.csv"
+
+    # Column-level transforms, run over all rows once the csv file is updated
+    stages = [
+        make_asset_type_stage(vault_info_file_path),
+        make_cum_share_price_stage(),
+    ]
+
+    if any([args.vaults, args.networks, args.from_month, args.to_month]):
+        recompute_selection(
+            args, output_file_path, metrics_file_path, strategy_index_file_path
+        )
+        apply_transforms(output_file_path, stages)
+        return
 
     # Getting the start datetime will require looping all rows in csv file to get the last row
     start_dt = get_start_datetime(output_file_path)
-    end_dt = datetime.now(timezone.utc)
+    end_dt = get_now()
     dates = get_start_and_end_of_month(start_dt, end_dt)
 
+    # A journal left behind by an interrupted run over the same months is resumed. Once
+    # another month has ended, its results were fetched too early and are discarded
+    last_month_end = to_timestamp(dates[-1][1].to_pydatetime()) if dates else 0
+    journal = RunJournal(
+        journal_file_path, f"{to_timestamp(start_dt)}-{last_month_end}"
+    )
+
     # Vault-level results
     exprs = [gen_share_price_expr, gen_aum_expr, gen_total_debt_expr]
-    vault_query_results = parse_vault_exprs(exprs, start_dt, end_dt)
+    vault_query_results = parse_query_results(
+        fetch_vault_exprs(exprs, start_dt, end_dt, journal)
+    )
 
-    # Strategy-level queries parsed to vault-level results
-    exprs = [gen_total_gains_expr]
-    vaults = list(vault_query_results[0].keys())
-    strategy_query_results = parse_strategy_exprs(exprs, vaults, start_dt, end_dt)
-
-    # Process and append data to the csv file
-    vault_query_results.extend(strategy_query_results)
-    parse_data_and_append_csv(vault_query_results, dates, output_file_path)
-
-    # Loop all rows in csv file again to update other data
-    update_asset_type_cb = make_update_asset_type_cb(vault_info_file_path)
-    update_cum_share_price_cb = make_update_cum_share_price_cb()
-    cbs = [update_asset_type_cb, update_cum_share_price_cb]
-    update_csv(output_file_path, cbs)
+    # Stream vaults through strategy queries, parsing and enrichment into rows
+    strategy_index = StrategyIndex(strategy_index_file_path)
+    try:
+        rows = parse_data_into_rows(
+            vault_query_results,
+            dates,
+            start_dt,
+            end_dt,
+            journal,
+            strategy_index,
+            use_event_logs=os.environ.get("GAINS_ENGINE") == "logs",
+            enrich_workers=args.workers,
+        )
+    finally:
+        strategy_index.save()
+
+    # Derived metrics over the daily share prices, as a companion dataset. They are
+    # upserted before the rows are appended, which moves the next run on to new months:
+    # a run stopped in between redoes both with the same journal
+    upsert_metrics_csv(
+        vault_query_results[0], dates, metrics_file_path, CSV_DATE_FORMAT
+    )
+    append_csv_rows(output_file_path, rows)
+
+    apply_transforms(output_file_path, stages)
+
+    # Rows are in the csv file now, the next run starts from a new month
+    journal.clear()
 
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Annotated, Literal, NewType, TypedDict
+from typing import Annotated, Any, Literal, NewType, Optional, TypedDict, Union
 
 from typing_extensions import NotRequired
 
@@ -53,11 +53,15 @@ class QueryResult(TypedDict):
     results: dict[NetworkStr, Frames]
 
 
+# Values of a yearn.vision series by timestamp
+Series = dict[int, int]
+
+
 class QueryResultMap(TypedDict):
     name: str
     network: NetworkStr
     address: Address
-    values: dict[int, int]
+    values: Series
 
 
 class VaultInfo(TypedDict):
@@ -88,3 +92,50 @@ class Vault(TypedDict):
 class Block(TypedDict):
     number: int
     timestamp: int  # seconds
+
+
+class StrategyReport(TypedDict):
+    event: Literal["StrategyReported"]
+    strategy: Address
+    block: int
+    log_index: int
+    total_gain: int
+    total_loss: int
+    total_debt: int
+
+
+class StrategyMigration(TypedDict):
+    event: Literal["StrategyMigrated"]
+    old_strategy: Address
+    new_strategy: Address
+    block: int
+    log_index: int
+
+
+StrategyEvent = Union[StrategyReport, StrategyMigration]
+
+
+class MonthRow(TypedDict):
+    key: str
+    month: str
+    month_end_ts: int
+    price: float
+    aum: float
+    debt_end: Optional[float]
+    gains_end: Optional[float]
+    row: Optional[list[str]]
+    is_journaled: bool
+
+
+class VaultTask(TypedDict):
+    name: str
+    network: NetworkStr
+    address: Address
+    values: list[Series]  # price, aum, debt and gains
+    months: list[MonthRow]
+
+
+class RecomputedVault(TypedDict):
+    rows: list[list[str]]
+    strategy_index: dict[str, dict[str, dict[str, bool]]]
+    interactions: dict[str, Any]  # recorded by the worker's cassette, if recording
@@ -1,8 +1,9 @@
 import calendar
 import csv
+import shutil
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Callable, Iterator, Optional
+from typing import Iterator, Optional
 
 import pandas as pd
 
@@ -15,9 +16,52 @@ def to_timestamp(date: datetime) -> int:
 
 
 def append_csv_rows(file_path: Path, rows: list[list]) -> None:
-    with open(file_path, "a") as csv_file:
+    """Rows are appended to a copy that replaces the file, so a crash never leaves partial rows"""
+    file_path = Path(file_path)
+    temp_path = file_path.parent.resolve() / f"temp{file_path.suffix}"
+    shutil.copyfile(file_path, temp_path)
+    with open(temp_path, "a") as csv_file:
         writer = csv.writer(csv_file)
         writer.writerows(rows)
+    temp_path.replace(file_path)
+
+
+def upsert_csv_rows(
+    file_path: Path,
+    rows: list[list],
+    key_columns: list[str],
+    month_column: str,
+    date_format: str,
+) -> None:
+    """
+    Replaces rows matching on `key_columns` in place, other rows are inserted keeping
+    the file sorted by month
+    """
+    file_path = Path(file_path)
+    temp_path = file_path.parent.resolve() / f"temp{file_path.suffix}"
+
+    with open(file_path, "r") as csv_file:
+        header, *existing_rows = list(csv.reader(csv_file))
+    key_indexes = [header.index(i) for i in key_columns]
+    month_index = header.index(month_column)
+
+    def to_key(row: list) -> tuple:
+        return tuple(row[i] for i in key_indexes)
+
+    new_rows = {to_key(row): row for row in rows}
+    merged_rows = []
+    for row in existing_rows:
+        merged_rows.append(new_rows.pop(to_key(row), row))
+    if new_rows:
+        merged_rows.extend(new_rows.values())
+        # Stable, so rows of the same month keep their order
+        merged_rows.sort(key=lambda i: datetime.strptime(i[month_index], date_format))
+
+    with open(temp_path, "w") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(header)
+        writer.writerows(merged_rows)
+    temp_path.replace(file_path)
 
 
 def get_csv_row(file_path: Path, line: int) -> Optional[list[str]]:
@@ -44,27 +88,6 @@ def add_months(sourcedate: datetime, months: int) -> datetime:
     return sourcedate.replace(year=year, month=month, day=day, tzinfo=timezone.utc)
 
 
-def update_csv(
-    output_file_path: Path, cbs: list[Callable[[int, list[str]], list]]
-) -> None:
-    output_path = Path(output_file_path)
-    output_path_ext = output_path.suffix
-    directory = output_path.parent.resolve()
-    temp_path = directory / f"temp{output_path_ext}"
-
-    with open(output_file_path, "r") as csv_file:
-        reader = csv.reader(csv_file)
-        with open(temp_path, "w") as csv_file:
-            writer = csv.writer(csv_file)
-
-            for line_num, row in enumerate(reader):
-                for cb in cbs:
-                    row = cb(line_num, row)
-                writer.writerow(row)
-    output_path.unlink()
-    temp_path.rename(output_path)
-
-
 def get_start_and_end_of_month(
     start_datetime: datetime, end_datetime: datetime
 ) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
@@ -0,0 +1,189 @@
+import logging
+from decimal import Decimal
+from typing import Optional
+
+from eth_typing import HexStr
+from helpers.constants import GET_LOGS_BLOCK_RANGE
+from helpers.web3 import Web3Provider
+from hexbytes import HexBytes
+from process_yearn_vision.typings import (
+    Address,
+    StrategyEvent,
+    StrategyMigration,
+    StrategyReport,
+)
+from process_yearn_vision.utils.yearn import get_activation, timestamp_to_block
+from web3 import Web3
+from web3.types import LogReceipt
+
+logger = logging.getLogger(__name__)
+
+# Fields in the data of each StrategyReported event version, the strategy is indexed
+STRATEGY_REPORTED_EVENTS = {
+    # 0.3.2 and later
+    "StrategyReported(address,uint256,uint256,uint256,uint256,uint256,uint256,uint256,uint256)": [
+        "gain",
+        "loss",
+        "debtPaid",
+        "totalGain",
+        "totalLoss",
+        "totalDebt",
+        "debtAdded",
+        "debtRatio",
+    ],
+    # 0.3.0 and 0.3.1
+    "StrategyReported(address,uint256,uint256,uint256,uint256,uint256,uint256,uint256)": [
+        "gain",
+        "loss",
+        "totalGain",
+        "totalLoss",
+        "totalDebt",
+        "debtAdded",
+        "debtRatio",
+    ],
+}
+
+STRATEGY_REPORTED_TOPICS = {
+    Web3.keccak(text=signature).hex(): fields
+    for signature, fields in STRATEGY_REPORTED_EVENTS.items()
+}
+
+# Same in every version, both strategies are indexed
+STRATEGY_MIGRATED_TOPIC = Web3.keccak(text="StrategyMigrated(address,address)").hex()
+
+STRATEGY_EVENT_TOPICS = [
+    HexStr(i) for i in [*STRATEGY_REPORTED_TOPICS, STRATEGY_MIGRATED_TOPIC]
+]
+
+
+def to_address(topic: HexBytes) -> Address:
+    return Address(Web3.toChecksumAddress(bytes(topic)[-20:]))
+
+
+def decode_strategy_reported(log: LogReceipt) -> StrategyReport:
+    fields = STRATEGY_REPORTED_TOPICS[HexBytes(log["topics"][0]).hex()]
+    data = bytes(HexBytes(log["data"]))
+    values = {
+        field: int.from_bytes(data[i * 32 : (i + 1) * 32], "big")
+        for i, field in enumerate(fields)
+    }
+    return {
+        "event": "StrategyReported",
+        "strategy": to_address(log["topics"][1]),
+        "block": log["blockNumber"],
+        "log_index": log["logIndex"],
+        "total_gain": values["totalGain"],
+        "total_loss": values["totalLoss"],
+        "total_debt": values["totalDebt"],
+    }
+
+
+def decode_strategy_migrated(log: LogReceipt) -> StrategyMigration:
+    return {
+        "event": "StrategyMigrated",
+        "old_strategy": to_address(log["topics"][1]),
+        "new_strategy": to_address(log["topics"][2]),
+        "block": log["blockNumber"],
+        "log_index": log["logIndex"],
+    }
+
+
+def decode_strategy_event(log: LogReceipt) -> StrategyEvent:
+    if HexBytes(log["topics"][0]).hex() == STRATEGY_MIGRATED_TOPIC:
+        return decode_strategy_migrated(log)
+    return decode_strategy_reported(log)
+
+
+def get_strategy_events(
+    w3: Web3Provider, vault_address: Address, from_block: int, to_block: int
+) -> list[StrategyEvent]:
+    events: list[StrategyEvent] = []
+    block_range = GET_LOGS_BLOCK_RANGE
+    start_block = from_block
+
+    while start_block <= to_block:
+        end_block = min(start_block + block_range - 1, to_block)
+        try:
+            logs = w3.provider.eth.get_logs(
+                {
+                    "address": Web3.toChecksumAddress(vault_address),
+                    "fromBlock": start_block,
+                    "toBlock": end_block,
+                    "topics": [STRATEGY_EVENT_TOPICS],
+                }
+            )
+        except ValueError as e:
+            # Providers reject ranges spanning too many blocks or results
+            if block_range == 1:
+                raise e
+            block_range = max(block_range // 2, 1)
+            logger.info(f"Retrying logs of {vault_address} with range={block_range}")
+            continue
+        events.extend(decode_strategy_event(log) for log in logs)
+        start_block = end_block + 1
+        # A dense stretch of blocks doesn't slow down the rest of the scan
+        block_range = min(block_range * 2, GET_LOGS_BLOCK_RANGE)
+
+    return events
+
+
+def fold_strategy_events(
+    events: list[StrategyEvent], blocks: list[int], decimals: int
+) -> dict[int, tuple[float, float]]:
+    """
+    Returns the vault's total debt and total gains (net of losses) as of each block.
+
+    A migration moves the debt of the old strategy to the new one without a report.
+    Debt repaid to cover withdrawals leaves no event at all, so the debt is an upper
+    bound, only good for cross-checking.
+    """
+    token_denom = Decimal(10**decimals)
+    sorted_events = sorted(events, key=lambda i: (i["block"], i["log_index"]))
+    debts: dict[Address, int] = {}
+    gains: dict[Address, int] = {}
+    series: dict[int, tuple[float, float]] = {}
+
+    event_index = 0
+    for block in sorted(blocks):
+        while (
+            event_index < len(sorted_events)
+            and sorted_events[event_index]["block"] <= block
+        ):
+            event = sorted_events[event_index]
+            if event["event"] == "StrategyMigrated":
+                debts[event["new_strategy"]] = debts.get(event["old_strategy"], 0)
+                debts[event["old_strategy"]] = 0
+            else:
+                debts[event["strategy"]] = event["total_debt"]
+                gains[event["strategy"]] = event["total_gain"] - event["total_loss"]
+            event_index += 1
+        debt = Decimal(sum(debts.values()))
+        gain = Decimal(sum(gains.values()))
+        series[block] = (float(debt / token_denom), float(gain / token_denom))
+    return series
+
+
+def cross_check(
+    name: str,
+    label: str,
+    value: float,
+    expected: Optional[float],
+    tolerance: float = 0.01,
+) -> None:
+    if expected is None:
+        return
+    diff = abs(value - expected)
+    if diff > tolerance * max(abs(expected), 1):
+        logger.warning(
+            f"{name} {label}={value} from event logs differs from yearn.vision={expected}"
+        )
+
+
+def get_report_series(
+    w3: Web3Provider, vault_address: Address, decimals: int, blocks: list[int]
+) -> dict[int, tuple[float, float]]:
+    """One paginated log scan from the vault's activation up to the last block"""
+    activation = get_activation(w3, vault_address)
+    from_block = timestamp_to_block(w3, activation) if activation else 0
+    events = get_strategy_events(w3, vault_address, from_block, max(blocks))
+    return fold_strategy_events(events, blocks, decimals)
@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class RunJournal:
+    run_id: str
+    file_path: Optional[Path]
+
+    """
+    Append-only journal of completed stages and rows, used to resume an interrupted run.
+
+    Each record is a single JSON line flushed to disk before the call returns, so a crash
+    can at most leave a truncated last line behind, which is ignored on load. Without a
+    file path, records are only kept in memory for the lifetime of the journal.
+    """
+
+    def __init__(self, file_path: Optional[Path], run_id: str):
+        self.file_path = Path(file_path) if file_path else None
+        self.run_id = run_id
+        self._lock = threading.Lock()
+        self._stages: dict[str, Any] = {}
+        self._rows: dict[str, list[str]] = {}
+        if self.file_path and not self._load(self.file_path):
+            self._reset()
+
+    def _load(self, file_path: Path) -> bool:
+        if not file_path.exists():
+            return False
+        with open(file_path, "r") as f:
+            lines = f.read().splitlines()
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, json.decoder.JSONDecodeError):
+            return False
+        if header.get("run") != self.run_id:
+            logger.info(f"Discarding stale journal for run={header.get('run')}")
+            return False
+
+        valid_lines = lines[:1]
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except json.decoder.JSONDecodeError:
+                # Only the last line can be partially written
+                break
+            valid_lines.append(line)
+            if record["type"] == "stage":
+                self._stages[record["name"]] = record["data"]
+            elif record["type"] == "row":
+                self._rows[record["key"]] = record["row"]
+        if len(valid_lines) != len(lines):
+            self._write(valid_lines)
+        logger.info(
+            f"Resuming run={self.run_id} with {len(self._stages)} stages and {len(self._rows)} rows"
+        )
+        return True
+
+    def _reset(self) -> None:
+        self._write([json.dumps({"run": self.run_id})])
+
+    def _write(self, lines: list[str]) -> None:
+        if self.file_path is None:
+            return
+        temp_path = self.file_path.with_suffix(f"{self.file_path.suffix}.tmp")
+        with open(temp_path, "w") as f:
+            f.writelines(f"{line}\n" for line in lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.file_path)
+
+    def _append(self, record: dict[str, Any]) -> None:
+        if self.file_path is None:
+            return
+        with open(self.file_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def stage(self, name: str, fn: Callable[[], T]) -> T:
+        """Returns the journaled result of `name`, or runs `fn` and journals a non-None result"""
+        with self._lock:
+            if name in self._stages:
+                return self._stages[name]
+        data = fn()
+        if data is not None:
+            with self._lock:
+                self._stages[name] = data
+                self._append({"type": "stage", "name": name, "data": data})
+        return data
+
+    def get_row(self, key: str) -> Optional[list[str]]:
+        with self._lock:
+            return self._rows.get(key)
+
+    def add_row(self, key: str, row: list[str]) -> None:
+        with self._lock:
+            self._rows[key] = row
+            self._append({"type": "row", "key": key, "row": row})
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stages = {}
+            self._rows = {}
+            if self.file_path:
+                self.file_path.unlink(missing_ok=True)
@@ -0,0 +1,121 @@
+import csv
+from datetime import timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from process_yearn_vision.typings import QueryResultMap
+from process_yearn_vision.utils.common import upsert_csv_rows
+
+DAYS_PER_YEAR = 365
+
+METRICS_COLUMNS = [
+    "Vault",
+    "Chain",
+    "Month",
+    "Month Return (%)",
+    "APR (%)",
+    "Max Drawdown (%)",
+    "Volatility (%)",
+]
+
+
+def to_price_frame(price_data: dict[str, QueryResultMap]) -> pd.DataFrame:
+    """Long frame of the daily pricePerShare of every vault, sorted by vault and date"""
+    records = [
+        (name, query_result_map["network"], timestamp, price)
+        for name, query_result_map in price_data.items()
+        for timestamp, price in query_result_map["values"].items()
+    ]
+    df = pd.DataFrame(records, columns=["Vault", "Chain", "Timestamp", "Price"])
+    df["Chain"] = df["Chain"].astype(str)
+    df["Date"] = pd.to_datetime(df["Timestamp"], unit="ms", utc=True)
+    df["Price"] = pd.to_numeric(df["Price"], errors="coerce")
+    return df.sort_values(["Vault", "Date"], ignore_index=True)
+
+
+def compute_daily_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.assign(Period=df["Date"].dt.tz_localize(None).dt.to_period("M"))
+    by_vault = df.groupby("Vault", sort=False)["Price"]
+    by_month = df.groupby(["Vault", "Period"], sort=False)["Price"]
+
+    daily_return = by_vault.pct_change().replace([np.inf, -np.inf], np.nan)
+    drawdown = df["Price"] / by_month.cummax() - 1
+    return df.assign(**{"Daily Return": daily_return, "Drawdown": drawdown})
+
+
+def compute_monthly_metrics(daily: pd.DataFrame) -> pd.DataFrame:
+    """
+    Monthly return and the APR it amounts to over the days it spans, max drawdown within
+    the month, and annualized volatility of the daily returns within the calendar month
+    (not a rolling window, so each month stands on its own)
+    """
+    grouped = daily.groupby(["Vault", "Chain", "Period"], sort=False)
+    monthly = grouped.agg(
+        first_date=("Date", "first"),
+        last_date=("Date", "last"),
+        first_price=("Price", "first"),
+        last_price=("Price", "last"),
+        std_return=("Daily Return", "std"),
+        max_drawdown=("Drawdown", "min"),
+    ).reset_index()
+
+    month_return = (monthly["last_price"] / monthly["first_price"] - 1).replace(
+        [np.inf, -np.inf], np.nan
+    )
+    days = (monthly["last_date"] - monthly["first_date"]).dt.days
+    apr = (month_return * DAYS_PER_YEAR / days).replace([np.inf, -np.inf], np.nan)
+    return pd.DataFrame(
+        {
+            "Vault": monthly["Vault"],
+            "Chain": monthly["Chain"],
+            "Period": monthly["Period"],
+            "Month Return (%)": month_return.fillna(0),
+            "APR (%)": apr.fillna(0),
+            "Max Drawdown (%)": monthly["max_drawdown"].fillna(0),
+            "Volatility (%)": (monthly["std_return"] * np.sqrt(DAYS_PER_YEAR)).fillna(
+                0
+            ),
+        }
+    )
+
+
+def get_metrics_rows(
+    price_data: dict[str, QueryResultMap],
+    dates: list[tuple[pd.Timestamp, pd.Timestamp]],
+    date_format: str,
+) -> list[list[str]]:
+    if not dates or not price_data:
+        return []
+    daily = compute_daily_metrics(to_price_frame(price_data))
+    monthly = compute_monthly_metrics(daily)
+
+    periods = [
+        month_end.tz_convert(timezone.utc).tz_localize(None).to_period("M")
+        for _, month_end in dates
+    ]
+    monthly = monthly[monthly["Period"].isin(periods)]
+    monthly = monthly.sort_values(["Period", "Vault"], kind="stable")
+    monthly.insert(2, "Month", monthly["Period"].dt.strftime(date_format).str.lower())
+    return monthly[METRICS_COLUMNS].astype(str).values.tolist()
+
+
+def create_metrics_csv(file_path: Path) -> None:
+    file_path = Path(file_path)
+    if not file_path.exists():
+        with open(file_path, "w") as csv_file:
+            csv.writer(csv_file).writerow(METRICS_COLUMNS)
+
+
+def upsert_metrics_csv(
+    price_data: dict[str, QueryResultMap],
+    dates: list[tuple[pd.Timestamp, pd.Timestamp]],
+    file_path: Path,
+    date_format: str,
+) -> None:
+    """Rows of a vault and month already in the file are replaced, so it can be redone"""
+    rows = get_metrics_rows(price_data, dates, date_format)
+    if not rows:
+        return
+    create_metrics_csv(file_path)
+    upsert_csv_rows(file_path, rows, ["Vault", "Month"], "Month", date_format)
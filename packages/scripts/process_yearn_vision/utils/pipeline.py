@@ -0,0 +1,103 @@
+import logging
+import queue
+import threading
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+QUEUE_POLL_INTERVAL = 0.5  # seconds
+
+_DONE = object()
+
+
+class PipelineStage:
+    name: str
+    workers: int
+
+    """
+    Step of a streaming pipeline, `fn` is run by `workers` threads on each item in turn
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], Any], workers: int = 1):
+        self.name = name
+        self.fn: Callable[[Any], Any] = fn
+        self.workers = workers
+
+
+def run_pipeline(
+    items: list[Any], stages: list[PipelineStage], queue_size: int
+) -> None:
+    """
+    Streams items through the stages, each item moving on as soon as a stage is done
+    with it. Queues between stages hold at most `queue_size` items, which bounds how many
+    items are in flight, not the items list itself. The first error stops the pipeline
+    and is raised.
+    """
+    queues: list[queue.Queue] = [queue.Queue(maxsize=queue_size) for _ in stages]
+    stop = threading.Event()
+    lock = threading.Lock()
+    errors: list[BaseException] = []
+    processed = [0 for _ in stages]
+    running = [stage.workers for stage in stages]
+
+    def put(q: queue.Queue, item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=QUEUE_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(q: queue.Queue) -> Any:
+        while not stop.is_set():
+            try:
+                return q.get(timeout=QUEUE_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def work(index: int) -> None:
+        stage = stages[index]
+        next_queue = queues[index + 1] if index + 1 < len(stages) else None
+        try:
+            while (item := get(queues[index])) is not _DONE:
+                result = stage.fn(item)
+                with lock:
+                    processed[index] += 1
+                    logger.info(f"[{stage.name}] {processed[index]}/{len(items)} done")
+                if next_queue is not None and not put(next_queue, result):
+                    return
+        except BaseException as e:
+            with lock:
+                errors.append(e)
+            logger.error(f"[{stage.name}] failed: {e}")
+            stop.set()
+            return
+        finally:
+            with lock:
+                running[index] -= 1
+                is_last_worker = running[index] == 0
+        # Let every worker of the next stage know nothing else is coming
+        if is_last_worker and next_queue is not None:
+            for _ in range(stages[index + 1].workers):
+                put(next_queue, _DONE)
+
+    threads = [
+        threading.Thread(target=work, args=(index,), name=f"{stage.name}-{i}")
+        for index, stage in enumerate(stages)
+        for i in range(stage.workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    for item in items:
+        if not put(queues[0], item):
+            break
+    for _ in range(stages[0].workers):
+        put(queues[0], _DONE)
+
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
@@ -0,0 +1,101 @@
+import copy
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from helpers.web3 import Web3Provider
+from web3 import Web3
+
+# EIP-1167 minimal proxy, used by yearn to clone strategies
+MINIMAL_PROXY_PREFIX = bytes.fromhex("363d3d373d3d3d363d73")
+MINIMAL_PROXY_SUFFIX = bytes.fromhex("5af43d82803e903d91602b57fd5bf3")
+
+
+def get_selector_push(signature: str) -> bytes:
+    """PUSHn of the function selector as emitted by the solidity dispatcher"""
+    selector = bytes(Web3.keccak(text=signature)[:4]).lstrip(b"\x00")
+    return bytes([0x5F + len(selector)]) + selector
+
+
+def get_implementation(code: bytes) -> Optional[str]:
+    if code.startswith(MINIMAL_PROXY_PREFIX) and code.endswith(MINIMAL_PROXY_SUFFIX):
+        return f"0x{code[len(MINIMAL_PROXY_PREFIX) : -len(MINIMAL_PROXY_SUFFIX)].hex()}"
+    return None
+
+
+class StrategyIndex:
+    file_path: Path
+
+    """
+    Per-chain index of which strategies expose a function, persisted across runs.
+
+    A strategy is looked up once from its bytecode: the function is implemented if its
+    selector is pushed by the dispatcher, which costs a single eth_getCode instead of an
+    ABI fetch and a failing eth_call for every month.
+    """
+
+    def __init__(self, file_path: Path):
+        self.file_path = Path(file_path)
+        self._index: dict[str, dict[str, dict[str, bool]]] = {}
+        self._is_dirty = False
+        self._lock = threading.Lock()
+        if self.file_path.exists():
+            with open(self.file_path, "r") as f:
+                self._index = json.load(f)
+
+    def supports(self, w3: Web3Provider, address: str, fn_signature: str) -> bool:
+        address = address.lower()
+        with self._lock:
+            chain_index = self._index.setdefault(f"{int(w3.chain_id)}", {})
+            fn_index = chain_index.setdefault(fn_signature, {})
+            if address in fn_index:
+                return fn_index[address]
+
+        code = bytes(w3.provider.eth.get_code(Web3.toChecksumAddress(address)))
+        if implementation := get_implementation(code):
+            code = bytes(
+                w3.provider.eth.get_code(Web3.toChecksumAddress(implementation))
+            )
+        if not code:
+            # Nothing deployed to check against, let the call decide
+            return True
+
+        is_supported = get_selector_push(fn_signature) in code
+        with self._lock:
+            fn_index[address] = is_supported
+            self._is_dirty = True
+        return is_supported
+
+    def to_dict(self) -> dict[str, dict[str, dict[str, bool]]]:
+        with self._lock:
+            return copy.deepcopy(self._index)
+
+    def update(self, index: dict[str, dict[str, dict[str, bool]]]) -> None:
+        """Adds entries looked up elsewhere, e.g. in worker processes"""
+        with self._lock:
+            self._merge(index)
+            self._is_dirty = True
+
+    def _merge(self, index: dict[str, dict[str, dict[str, bool]]]) -> None:
+        for chain, chain_index in index.items():
+            for fn_signature, fn_index in chain_index.items():
+                merged = self._index.setdefault(chain, {}).setdefault(fn_signature, {})
+                for address, is_supported in fn_index.items():
+                    merged.setdefault(address, is_supported)
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._is_dirty:
+                return
+            # Keep entries saved meanwhile by other runs sharing the file
+            if self.file_path.exists():
+                with open(self.file_path, "r") as f:
+                    self._merge(json.load(f))
+            temp_path = self.file_path.with_suffix(f"{self.file_path.suffix}.tmp")
+            with open(temp_path, "w") as f:
+                json.dump(self._index, f, indent=2, sort_keys=True)
+                f.write("\n")
+            os.replace(temp_path, self.file_path)
+            self._is_dirty = False
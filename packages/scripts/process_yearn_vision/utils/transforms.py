@@ -0,0 +1,53 @@
+import csv
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+
+class TransformStage:
+    name: str
+    reads: dict[str, str]
+    writes: list[str]
+
+    """
+    Batch operation over typed columns of a csv file.
+
+    `reads` maps each input column to the dtype it is converted to, `fn` receives those
+    columns as a frame and returns a frame holding every column in `writes`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        reads: dict[str, str],
+        writes: list[str],
+        fn: Callable[[pd.DataFrame], pd.DataFrame],
+    ):
+        self.name = name
+        self.reads = reads
+        self.writes = writes
+        # Annotated here, as mypy takes a callable declared on the class for a method
+        self.fn: Callable[[pd.DataFrame], pd.DataFrame] = fn
+
+
+def apply_transforms(file_path: Path, stages: list[TransformStage]) -> None:
+    file_path = Path(file_path)
+    temp_path = file_path.parent.resolve() / f"temp{file_path.suffix}"
+
+    # Untouched columns are written back exactly as they were read
+    df = pd.read_csv(file_path, dtype=str, keep_default_na=False)
+    for stage in stages:
+        missing = [i for i in [*stage.reads, *stage.writes] if i not in df.columns]
+        if missing:
+            raise ValueError(f"Columns {missing} not found for stage {stage.name}")
+        batch = df[list(stage.reads)].astype(stage.reads)
+        result = stage.fn(batch)
+        for column in stage.writes:
+            df[column] = result[column].astype(str).values
+
+    with open(temp_path, "w") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(df.columns)
+        writer.writerows(df.values.tolist())
+    temp_path.replace(file_path)
@@ -2,12 +2,17 @@ from decimal import Decimal
 from typing import Optional
 
 from helpers.constants import Network
-from helpers.network import client, parse_json
+from helpers.network import client, parse_json, single_flight
 from helpers.web3 import Web3Provider
 from process_yearn_vision.typings import Address, Block, Vault
-from web3 import exceptions
+from process_yearn_vision.utils.strategy_index import StrategyIndex
+from web3 import Web3, exceptions
+from web3.types import BlockData
 
+ACTIVATION_SELECTOR = Web3.keccak(text="activation()")[:4].hex()
 
+
+@single_flight(key=lambda vault_address, network: (vault_address.lower(), network))
 def get_vault(vault_address: Address, network: Network) -> Optional[Vault]:
     ydaemon = "https://ydaemon.yearn.finance"
     endpoint = f"{ydaemon}/{network}/vaults/{vault_address}"
@@ -16,12 +21,16 @@ def get_vault(vault_address: Address, network: Network) -> Optional[Vault]:
     return vault
 
 
-def get_delegated_assets(w3: Web3Provider, vault: Vault, block: int) -> float:
+def get_delegated_assets(
+    w3: Web3Provider, vault: Vault, block: int, strategy_index: StrategyIndex
+) -> float:
     strategies = vault["strategies"]
     token_denom = Decimal(10 ** vault["token"]["decimals"])
     delegatedAssets = Decimal(0)
 
     for strategy in strategies:
+        if not strategy_index.supports(w3, strategy["address"], "delegatedAssets()"):
+            continue
         try:
             asset = w3.call(strategy["address"], "delegatedAssets", block=block)
             asset = Decimal(asset) if asset else Decimal(0)
@@ -32,14 +41,37 @@ def get_delegated_assets(w3: Web3Provider, vault: Vault, block: int) -> float:
     return float(delegatedAssets)
 
 
-def timestamp_to_block(
+def get_activation(w3: Web3Provider, vault_address: Address) -> int:
+    """
+    Timestamp the vault was activated at, or 0 if it can't be read. A raw eth_call, as
+    unverified vaults have no ABI on etherscan
+    """
+    try:
+        data = w3.provider.eth.call(
+            {"to": Web3.toChecksumAddress(vault_address), "data": ACTIVATION_SELECTOR}
+        )
+    except ValueError:
+        return 0
+    return int.from_bytes(bytes(data)[:32], "big")
+
+
+def to_block(block: BlockData) -> Block:
+    return {"number": block["number"], "timestamp": block["timestamp"]}
+
+
+@single_flight(key=lambda w3, ts: (w3.chain_id, ts))
+def timestamp_to_block(w3: Web3Provider, ts: int) -> int:
+    left_block = to_block(w3.provider.eth.get_block("earliest"))
+    right_block = to_block(w3.provider.eth.get_block("latest"))
+    return search_block(w3, ts, left_block, right_block)
+
+
+def search_block(
     w3: Web3Provider,
     ts: int,
-    left_block: Optional[Block] = None,
-    right_block: Optional[Block] = None,
+    left_block: Block,
+    right_block: Block,
 ) -> int:
-    left_block = left_block if left_block else w3.provider.eth.get_block("earliest")
-    right_block = right_block if right_block else w3.provider.eth.get_block("latest")
     earliest_block_num = left_block["number"]
     earliest_ts = left_block["timestamp"]
     latest_block_num = right_block["number"]
@@ -87,7 +119,7 @@ def timestamp_to_block(
         return expected_block
 
     # Recurse using tightened bounds
-    return timestamp_to_block(
+    return search_block(
         w3,
         ts,
         {"number": earliest_block_num, "timestamp": earliest_ts},
@@ -0,0 +1,104 @@
+import csv
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+# Same import roots as `python process_yearn_vision/main.py` run from packages/scripts
+ROOT = Path(__file__).parent.parent.resolve()
+sys.path[:0] = [str(ROOT), str(ROOT / "process_yearn_vision")]
+
+from helpers import cassette, network  # noqa: E402
+from helpers.cassette import get_cassette  # noqa: E402
+from helpers.http_cache import HTTPCache  # noqa: E402
+from process_yearn_vision.main import CSV_DATE_FORMAT  # noqa: E402
+from process_yearn_vision.utils.common import add_months  # noqa: E402
+from stubs import (  # noqa: E402
+    HEADER,
+    VAULTS,
+    RPCHandler,
+    StubRPCServer,
+    StubUpstreams,
+    handle_chain_rpc,
+)
+
+
+@pytest.fixture
+def stub_rpc():
+    servers: list[StubRPCServer] = []
+
+    def make(handler: RPCHandler, delay: float = 0) -> StubRPCServer:
+        server = StubRPCServer(handler, delay)
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.close()
+
+
+@pytest.fixture
+def stub_upstreams():
+    adapters: list[StubUpstreams] = []
+
+    def make(vaults: dict[str, str] = VAULTS) -> StubUpstreams:
+        adapter = StubUpstreams(vaults)
+        adapter.mount()
+        adapters.append(adapter)
+        return adapter
+
+    yield make
+    for adapter in adapters:
+        adapter.unmount()
+
+
+@pytest.fixture
+def chain(stub_rpc, tmp_path: Path, monkeypatch) -> StubRPCServer:
+    """Stub mainnet node, along with the rest of the environment main() reads"""
+    server = stub_rpc(handle_chain_rpc)
+    monkeypatch.setenv("ETH_PROVIDER", server.url)
+    monkeypatch.setenv("ETHERSCAN_TOKEN", "token")
+    for name in ["CASSETTE_MODE", "GAINS_ENGINE", "RPC_HEDGE"]:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(network, "http_cache", HTTPCache(tmp_path / "http"))
+    get_cassette.cache_clear()
+    yield server
+    get_cassette.cache_clear()
+
+
+@pytest.fixture
+def cassette_path(tmp_path: Path, chain: StubRPCServer, monkeypatch) -> Path:
+    monkeypatch.setenv("CASSETTE_PATH", str(tmp_path / "cassette.json.gz"))
+    # Recording saves at exit, tests save explicitly
+    monkeypatch.setattr(cassette.atexit, "register", lambda fn: None)
+    return tmp_path / "cassette.json.gz"
+
+
+@pytest.fixture
+def data_dir(tmp_path: Path) -> Path:
+    """Output with its last row three months ago, so two months are processed"""
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    last_month = add_months(datetime.now(timezone.utc).replace(day=1), -3)
+    with open(data_dir / "output.csv", "w") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerow(
+            [
+                next(iter(VAULTS)),
+                "ETH",
+                "Stable",
+                last_month.strftime(CSV_DATE_FORMAT).lower(),
+                "0",
+                "0.0",
+                "0",
+                "Under $10 million",
+                "0",
+                "0",
+            ]
+        )
+    with open(data_dir / "vault_info.json", "w") as f:
+        json.dump({name: {"assetType": "Stable"} for name in VAULTS}, f)
+    return data_dir
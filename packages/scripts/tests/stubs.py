@@ -0,0 +1,203 @@
+import csv
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable
+
+import requests
+from helpers import network
+from requests.adapters import BaseAdapter
+
+RPCHandler = Callable[[str, list], dict[str, Any]]
+
+
+class StubRPCServer:
+    url: str
+    calls: list[str]
+
+    """
+    JSON-RPC endpoint on localhost. `handler` returns the "result" or "error" member of
+    the response to each request, which is sent after `delay` seconds
+    """
+
+    def __init__(self, handler: RPCHandler, delay: float = 0):
+        self.handler = handler
+        self.delay = delay
+        self.calls = []
+        stub = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.calls.append(body["method"])
+                time.sleep(stub.delay)
+                response = {"jsonrpc": "2.0", "id": body["id"]}
+                response.update(stub.handler(body["method"], body["params"]))
+                content = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), RequestHandler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+VAULTS = {
+    "yvDAI 0.4.3 - ETH": "0xdA816459F1AB5631232FE5e97a05BBBb94970c95",
+    "yvUSDC 0.4.3 - ETH": "0xa354F35829Ae975e850e23e9615b11Da1B3dC4DE",
+}
+STRATEGY_ADDRESS = "0x1676055fE954EE6fc388F9096210E5EbE0A9070c"
+
+GENESIS_TIMESTAMP = 1_438_269_973
+BLOCK_TIME = 12  # seconds
+
+HEADER = [
+    "Vault",
+    "Chain",
+    "Type",
+    "Month",
+    "Month Return (%)",
+    "Cumulative Return (%)",
+    "AUM ($)",
+    "AUM Size",
+    " Total Debt",
+    " Total Gains",
+]
+
+UPSTREAMS = ["https://yearn.vision", "https://ydaemon.yearn.finance"]
+
+# Upstream values by the yearn.vision param of each query
+PARAMS = {"pricePerShare": 1.0, "tvl": 20_000_000, "totalDebt": 15_000_000}
+
+
+def get_param_value(expr: str, day: int) -> float:
+    for param, value in PARAMS.items():
+        if f'param="{param}"' in expr:
+            return value * (1 + day / 1000) if param == "pricePerShare" else value
+    raise ValueError(f"Unexpected query {expr}")
+
+
+def to_frame(name: str, fields: list[dict], timestamps: list, values: list) -> dict:
+    return {
+        "schema": {"name": name, "refId": "ETH", "meta": {}, "fields": fields},
+        "data": {"values": [timestamps, values]},
+    }
+
+
+def to_frames(expr: str, timestamps: list[int], vaults: dict[str, str]) -> list[dict]:
+    time_field = {"name": "Time", "type": "time", "typeInfo": {}}
+    if match := re.search(r'vault=~"([^"]+)"', expr):
+        # Aggregated strategy queries lose their labels, as on yearn.vision
+        zeros = [0 for _ in timestamps]
+        return [to_frame(f"{match[1]} - ETH", [time_field], timestamps, zeros)]
+
+    values = [get_param_value(expr, i) for i in range(len(timestamps))]
+    frames = []
+    for name, address in vaults.items():
+        value_field = {
+            "name": "Value",
+            "type": "number",
+            "typeInfo": {},
+            "labels": {"address": address},
+        }
+        frames.append(to_frame(name, [time_field, value_field], timestamps, values))
+    return frames
+
+
+def to_query_result(body: dict, vaults: dict[str, str]) -> dict:
+    start, end = int(body["from"]), int(body["to"])
+    timestamps = list(range(start, end + 1, 86_400_000))
+    results: dict[str, Any] = {}
+    for query in body["queries"]:
+        frames = []
+        if query["refId"] == "ETH":
+            frames = to_frames(query["expr"], timestamps, vaults)
+        results[query["refId"]] = {"frames": frames}
+    return {"results": results}
+
+
+class StubUpstreams(BaseAdapter):
+    requests: list[requests.PreparedRequest]
+
+    """
+    Answers yearn.vision and ydaemon requests about `vaults`, once mounted on the
+    session of `client`. Requests for which `fail` is true get a 500
+    """
+
+    def __init__(self, vaults: dict[str, str]):
+        super().__init__()
+        self.vaults = vaults
+        self.requests = []
+        self.fail: Callable[[requests.PreparedRequest], bool] = lambda request: False
+
+    def mount(self) -> None:
+        for prefix in UPSTREAMS:
+            network.session.mount(prefix, self)
+
+    def unmount(self) -> None:
+        for prefix in UPSTREAMS:
+            network.session.adapters.pop(prefix, None)
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url
+        response.request = request
+        response.headers["Content-Type"] = "application/json"
+        data: dict[str, Any] = {}
+        if self.fail(request):
+            response.status_code = 500
+        elif request.url.startswith("https://yearn.vision/api/ds/query"):
+            data = to_query_result(json.loads(request.body), self.vaults)
+        elif request.url.startswith("https://ydaemon.yearn.finance/1/vaults/"):
+            data = {
+                "strategies": [
+                    {"address": STRATEGY_ADDRESS, "name": "Strategy", "description": ""}
+                ],
+                "token": {"decimals": 18},
+            }
+        else:
+            response.status_code = 404
+        response._content = json.dumps(data).encode()
+        return response
+
+    def close(self):
+        pass
+
+
+def handle_chain_rpc(method: str, params: list) -> dict:
+    latest = (int(time.time()) - GENESIS_TIMESTAMP) // BLOCK_TIME
+    if method == "eth_getBlockByNumber":
+        tags = {"earliest": 0, "latest": latest}
+        number = tags[params[0]] if params[0] in tags else int(params[0], 16)
+        return {
+            "result": {
+                "number": hex(number),
+                "timestamp": hex(GENESIS_TIMESTAMP + number * BLOCK_TIME),
+                "hash": f"0x{number:064x}",
+            }
+        }
+    if method == "eth_getCode":
+        # Deployed, without a delegatedAssets() selector
+        return {"result": "0x6080604052348015600f57600080fd5b50"}
+    return {"error": {"code": -32601, "message": f"Unsupported method {method}"}}
+
+
+def read_rows(file_path: Path) -> list[list[str]]:
+    with open(file_path, "r") as f:
+        return list(csv.reader(f))
@@ -0,0 +1,80 @@
+import json
+from pathlib import Path
+
+import requests
+from helpers.cassette import get_cassette
+from helpers.constants import Network
+from helpers.network import session
+from helpers.web3 import Web3Provider
+from requests.adapters import BaseAdapter
+from stubs import GENESIS_TIMESTAMP, STRATEGY_ADDRESS, StubRPCServer
+
+ETHERSCAN = "https://api.etherscan.io"
+
+
+class StubEtherscan(BaseAdapter):
+    """Answers ABI requests, after as many rate limit errors as `rate_limited`"""
+
+    def __init__(self, rate_limited: int):
+        super().__init__()
+        self.rate_limited = rate_limited
+        self.calls = 0
+
+    def send(self, request, **kwargs):
+        self.calls += 1
+        body = {"status": "1", "message": "OK", "result": "[]"}
+        if self.calls <= self.rate_limited:
+            body = {
+                "status": "0",
+                "message": "NOTOK",
+                "result": "Max rate limit reached",
+            }
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url
+        response.headers["Content-Type"] = "application/json"
+        response._content = json.dumps(body).encode()
+        return response
+
+    def close(self):
+        pass
+
+
+def test_error_is_not_served_to_retries_while_recording(
+    cassette_path: Path, chain: StubRPCServer, monkeypatch
+):
+    monkeypatch.setenv("CASSETTE_MODE", "record")
+    etherscan = StubEtherscan(rate_limited=1)
+    session.mount(ETHERSCAN, etherscan)
+    try:
+        assert Web3Provider(Network.Mainnet).get_contract(STRATEGY_ADDRESS)
+    finally:
+        del session.adapters[ETHERSCAN]
+    assert etherscan.calls == 2
+    get_cassette().save()
+
+    # The ABI is replayed from the first attempt on
+    monkeypatch.setenv("CASSETTE_MODE", "replay")
+    get_cassette.cache_clear()
+    assert Web3Provider(Network.Mainnet).get_contract(STRATEGY_ADDRESS)
+
+
+def test_latest_block_is_pinned_while_recording(
+    cassette_path: Path, stub_rpc, monkeypatch
+):
+    calls = []
+
+    def handle_rpc(method: str, params: list) -> dict:
+        """Every request for the latest block finds a new one"""
+        calls.append(params[0])
+        number = len(calls) if params[0] == "latest" else int(params[0], 16)
+        block = {"number": hex(number), "timestamp": hex(GENESIS_TIMESTAMP + number)}
+        return {"result": {**block, "hash": f"0x{number:064x}"}}
+
+    monkeypatch.setenv("ETH_PROVIDER", stub_rpc(handle_rpc).url)
+    monkeypatch.setenv("CASSETTE_MODE", "record")
+    w3 = Web3Provider(Network.Mainnet).provider
+
+    assert [w3.eth.get_block("latest")["number"] for _ in range(2)] == [1, 1]
+    assert [w3.eth.get_block(7)["number"] for _ in range(2)] == [7, 7]
+    assert calls == ["latest", "0x7", "0x7"]
@@ -0,0 +1,100 @@
+from helpers.constants import Network
+from helpers.web3 import Web3Provider
+from hexbytes import HexBytes
+from process_yearn_vision.utils import events
+from process_yearn_vision.utils.events import (
+    STRATEGY_MIGRATED_TOPIC,
+    decode_strategy_event,
+    fold_strategy_events,
+    get_strategy_events,
+)
+from process_yearn_vision.utils.yearn import get_activation
+from web3 import Web3
+
+VAULT_ADDRESS = "0xdA816459F1AB5631232FE5e97a05BBBb94970c95"
+OLD_STRATEGY = "0x1676055fE954EE6fc388F9096210E5EbE0A9070c"
+NEW_STRATEGY = "0x2216E44fA633ABd2540dB72Ad34b42C7F1557cd4"
+
+REPORTED_TOPIC = Web3.keccak(
+    text="StrategyReported(address,uint256,uint256,uint256,uint256,uint256,uint256,uint256,uint256)"
+)
+
+
+def to_topic(address: str) -> HexBytes:
+    return HexBytes(bytes(12) + bytes(HexBytes(address)))
+
+
+def reported_log(strategy: str, block: int, total_gain: int, total_debt: int) -> dict:
+    # gain, loss, debtPaid, totalGain, totalLoss, totalDebt, debtAdded, debtRatio
+    fields = [0, 0, 0, total_gain, 0, total_debt, 0, 0]
+    return {
+        "topics": [REPORTED_TOPIC, to_topic(strategy)],
+        "data": HexBytes(b"".join(i.to_bytes(32, "big") for i in fields)).hex(),
+        "blockNumber": block,
+        "logIndex": 0,
+    }
+
+
+def migrated_log(old_strategy: str, new_strategy: str, block: int) -> dict:
+    return {
+        "topics": [
+            HexBytes(STRATEGY_MIGRATED_TOPIC),
+            to_topic(old_strategy),
+            to_topic(new_strategy),
+        ],
+        "data": "0x",
+        "blockNumber": block,
+        "logIndex": 0,
+    }
+
+
+def test_migration_moves_debt_to_the_new_strategy():
+    logs = [
+        reported_log(OLD_STRATEGY, 10, total_gain=5, total_debt=100),
+        migrated_log(OLD_STRATEGY, NEW_STRATEGY, 20),
+        reported_log(NEW_STRATEGY, 30, total_gain=2, total_debt=120),
+    ]
+    events = [decode_strategy_event(log) for log in logs]
+
+    series = fold_strategy_events(events, [15, 25, 35], decimals=0)
+
+    assert series == {15: (100, 5), 25: (100, 5), 35: (120, 7)}
+
+
+def test_log_range_grows_back_after_a_dense_stretch(stub_rpc, chain, monkeypatch):
+    monkeypatch.setattr(events, "GET_LOGS_BLOCK_RANGE", 8000)
+    pages = []
+
+    def handle_rpc(method: str, params: list) -> dict:
+        """Blocks below 1000 are dense, no range of more than 1000 blocks covers them"""
+        from_block, to_block = (int(params[0][i], 16) for i in ["fromBlock", "toBlock"])
+        if from_block < 1000 and to_block - from_block >= 1000:
+            return {
+                "error": {
+                    "code": -32005,
+                    "message": "query returned more than 10000 results",
+                }
+            }
+        pages.append(to_block - from_block + 1)
+        return {"result": []}
+
+    monkeypatch.setenv("ETH_PROVIDER", stub_rpc(handle_rpc).url)
+    w3 = Web3Provider(Network.Mainnet)
+
+    assert get_strategy_events(w3, VAULT_ADDRESS, 0, 63_999) == []
+    assert pages == [1000, 2000, 4000, *[8000] * 7, 1000]
+
+
+def test_activation_of_a_vault_that_cant_tell_is_zero(stub_rpc, chain, monkeypatch):
+    activation = 1_600_000_000
+
+    def handle_rpc(method: str, params: list) -> dict:
+        if params[0]["to"] == VAULT_ADDRESS:
+            return {"result": f"0x{activation:064x}"}
+        return {"error": {"code": 3, "message": "execution reverted"}}
+
+    monkeypatch.setenv("ETH_PROVIDER", stub_rpc(handle_rpc).url)
+    w3 = Web3Provider(Network.Mainnet)
+
+    assert get_activation(w3, VAULT_ADDRESS) == activation
+    assert get_activation(w3, OLD_STRATEGY) == 0
@@ -0,0 +1,100 @@
+import json
+import time
+from pathlib import Path
+
+import pytest
+from process_yearn_vision import main as main_module
+from process_yearn_vision.main import main
+from process_yearn_vision.utils.journal import RunJournal
+from stubs import VAULTS, read_rows
+
+
+def get_journaled_rows(file_path: Path) -> dict[str, list[str]]:
+    rows = {}
+    with open(file_path, "r") as f:
+        for line in f.read().splitlines()[1:]:
+            record = json.loads(line)
+            if record["type"] == "row":
+                rows[record["key"]] = record["row"]
+    return rows
+
+
+def test_interrupted_run_resumes_from_the_journal(
+    data_dir: Path, chain, stub_upstreams
+):
+    journal_file_path = data_dir / "journal.jsonl"
+    (first, first_address), (second, second_address) = VAULTS.items()
+    upstreams = stub_upstreams()
+
+    def fail_second_vault(request) -> bool:
+        """ydaemon fails on the second vault, once the first one is journaled"""
+        if not request.url.endswith(second_address):
+            return False
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            rows = get_journaled_rows(journal_file_path)
+            if len([i for i in rows if i.startswith(f"{first}|")]) == 2:
+                break
+            time.sleep(0.05)
+        return True
+
+    upstreams.fail = fail_second_vault
+    with pytest.raises(ValueError, match=f"Failed to fetch vault {second}"):
+        main(["--data-dir", str(data_dir)])
+    journaled_rows = get_journaled_rows(journal_file_path)
+    assert [i.split("|")[0] for i in journaled_rows] == [first, first]
+    assert len(read_rows(data_dir / "output.csv")) == 2
+
+    upstreams.fail = lambda request: False
+    upstreams.requests = []
+    main(["--data-dir", str(data_dir)])
+
+    # Queries and rows of the first run are reused, only the second vault is enriched
+    assert [i.url for i in upstreams.requests] == [
+        f"https://ydaemon.yearn.finance/1/vaults/{second_address}"
+    ]
+    output = read_rows(data_dir / "output.csv")
+    assert [row[0] for row in output[2:]] == [first, second, first, second]
+    assert not journal_file_path.exists()
+
+
+@pytest.mark.parametrize("is_appended", [False, True])
+def test_run_stopped_around_appending_rows_keeps_its_metrics(
+    data_dir: Path, chain, stub_upstreams, monkeypatch, is_appended: bool
+):
+    stub_upstreams()
+    append_csv_rows = main_module.append_csv_rows
+
+    def stop(*args):
+        if is_appended:
+            append_csv_rows(*args)
+        raise RuntimeError("Stopped")
+
+    with monkeypatch.context() as m:
+        m.setattr(main_module, "append_csv_rows", stop)
+        with pytest.raises(RuntimeError):
+            main(["--data-dir", str(data_dir)])
+    main(["--data-dir", str(data_dir)])
+
+    metrics = read_rows(data_dir / "metrics.csv")
+    assert [row[0] for row in metrics[1:]] == [*VAULTS, *VAULTS]
+    assert len(read_rows(data_dir / "output.csv")) == 6
+
+
+def test_truncated_last_line_is_dropped(tmp_path: Path):
+    file_path = tmp_path / "journal.jsonl"
+    journal = RunJournal(file_path, "run")
+    journal.stage("prices", lambda: {"1": 1.0})
+    journal.add_row("vault|1", ["vault", "1"])
+    # A crash while the next row is written
+    with open(file_path, "a") as f:
+        f.write('{"type": "row", "key": "vault|2", "ro')
+
+    resumed = RunJournal(file_path, "run")
+    assert resumed.stage("prices", lambda: None) == {"1": 1.0}
+    assert resumed.get_row("vault|1") == ["vault", "1"]
+    assert resumed.get_row("vault|2") is None
+
+    # Records appended after the resume are kept on the next load
+    resumed.add_row("vault|2", ["vault", "2"])
+    assert RunJournal(file_path, "run").get_row("vault|2") == ["vault", "2"]
@@ -0,0 +1,35 @@
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from process_yearn_vision.main import CSV_DATE_FORMAT, main, parse_args
+from process_yearn_vision.utils.common import add_months
+from stubs import VAULTS, read_rows
+
+
+def test_selection_leaves_new_months_to_the_next_run(
+    data_dir: Path, chain, stub_upstreams
+):
+    stub_upstreams()
+    first, second = VAULTS
+    months = [
+        add_months(datetime.now(timezone.utc).replace(day=1), i) for i in [-3, -2, -1]
+    ]
+    argv = ["--data-dir", str(data_dir), "--vaults", second]
+    main([*argv, "--from", months[0].strftime("%Y-%m")])
+    output = read_rows(data_dir / "output.csv")
+    assert [row[0] for row in output[1:]] == [first, second]
+
+    main(["--data-dir", str(data_dir)])
+    output = read_rows(data_dir / "output.csv")
+    assert [(row[0], row[3]) for row in output[1:]] == [
+        (name, month.strftime(CSV_DATE_FORMAT).lower())
+        for month in months
+        for name in VAULTS
+    ]
+
+
+@pytest.mark.parametrize("option", ["--workers", "--processes"])
+def test_counts_below_one_are_rejected(option: str):
+    with pytest.raises(SystemExit):
+        parse_args([option, "0"])
@@ -0,0 +1,80 @@
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from helpers.cassette import CassetteMissError, get_cassette
+from process_yearn_vision.main import main
+from process_yearn_vision.utils.common import add_months
+from stubs import VAULTS, StubRPCServer, read_rows
+
+
+def record_and_replay(
+    argv: list[str], data_dir: Path, chain: StubRPCServer, stub_upstreams, monkeypatch
+) -> list[list[str]]:
+    """Records main() against local upstreams, then checks that a replay matches it"""
+    initial_output = (data_dir / "output.csv").read_bytes()
+
+    monkeypatch.setenv("CASSETTE_MODE", "record")
+    upstreams = stub_upstreams()
+    main(argv)
+    get_cassette().save()
+    recorded_output = read_rows(data_dir / "output.csv")
+    recorded_metrics = read_rows(data_dir / "metrics.csv")
+
+    # Replay later on, with every upstream gone and the state of the first run reset
+    upstreams.unmount()
+    chain.close()
+    (data_dir / "output.csv").write_bytes(initial_output)
+    (data_dir / "metrics.csv").unlink()
+    (data_dir / "strategy_index.json").unlink()
+    time.sleep(0.01)
+    monkeypatch.setenv("CASSETTE_MODE", "replay")
+    get_cassette.cache_clear()
+    main(argv)
+
+    assert read_rows(data_dir / "output.csv") == recorded_output
+    assert read_rows(data_dir / "metrics.csv") == recorded_metrics
+    return recorded_output
+
+
+def test_replay_of_main_matches_recorded_run(
+    data_dir: Path, cassette_path: Path, chain, stub_upstreams, monkeypatch
+):
+    output = record_and_replay(
+        ["--data-dir", str(data_dir)], data_dir, chain, stub_upstreams, monkeypatch
+    )
+
+    assert [row[0] for row in output[2:]] == [*VAULTS, *VAULTS]
+    assert {row[8] for row in output[2:]} == {"15000000.0"}
+
+
+def test_replay_of_selection_recomputed_in_processes(
+    data_dir: Path, cassette_path: Path, chain, stub_upstreams, monkeypatch
+):
+    first_month = add_months(datetime.now(timezone.utc).replace(day=1), -3)
+    argv = [
+        "--data-dir",
+        str(data_dir),
+        "--vaults",
+        *VAULTS,
+        "--from",
+        first_month.strftime("%Y-%m"),
+        "--processes",
+        "2",
+    ]
+    output = record_and_replay(argv, data_dir, chain, stub_upstreams, monkeypatch)
+
+    # Only the last month of output.csv is recomputed, the rows of new vaults inserted
+    assert [row[0] for row in output[1:]] == [*VAULTS]
+    assert {row[8] for row in output[1:]} == {"15000000.0"}
+
+
+def test_replay_miss_stops_main(data_dir: Path, cassette_path: Path, monkeypatch):
+    monkeypatch.setenv("CASSETTE_MODE", "record")
+    get_cassette().save()
+
+    monkeypatch.setenv("CASSETTE_MODE", "replay")
+    get_cassette.cache_clear()
+    with pytest.raises(CassetteMissError):
+        main(["--data-dir", str(data_dir)])
@@ -0,0 +1,59 @@
+import statistics
+from datetime import datetime, timezone
+
+import pytest
+from process_yearn_vision.utils.common import get_start_and_end_of_month, to_timestamp
+from process_yearn_vision.utils.metrics import METRICS_COLUMNS, get_metrics_rows
+
+# Share prices of a vault growing more in January than in February, where it dips by
+# 10% for a day
+PRICES = {
+    datetime(2022, 1, 1): 1.0,
+    datetime(2022, 1, 16): 1.01,
+    datetime(2022, 1, 31): 1.03,
+    datetime(2022, 2, 1): 1.03,
+    datetime(2022, 2, 14): 0.927,
+    datetime(2022, 2, 15): 1.03,
+    datetime(2022, 2, 28): 1.05678,
+}
+
+
+def get_volatility(prices: list[float]) -> float:
+    returns = [new / old - 1 for old, new in zip(prices, prices[1:])]
+    return statistics.stdev(returns) * 365**0.5
+
+
+def test_metrics_of_a_fixed_series():
+    price_data = {
+        "yvDAI 0.4.3 - ETH": {
+            "name": "yvDAI 0.4.3 - ETH",
+            "network": "ETH",
+            "address": "0xdA816459F1AB5631232FE5e97a05BBBb94970c95",
+            "values": {
+                to_timestamp(date.replace(tzinfo=timezone.utc)): price
+                for date, price in PRICES.items()
+            },
+        }
+    }
+    dates = get_start_and_end_of_month(
+        datetime(2022, 1, 1, tzinfo=timezone.utc),
+        datetime(2022, 3, 1, tzinfo=timezone.utc),
+    )
+
+    rows = get_metrics_rows(price_data, dates, "%b/%y")
+    january, february = [dict(zip(METRICS_COLUMNS, row)) for row in rows]
+
+    assert [january["Month"], february["Month"]] == ["jan/22", "feb/22"]
+    assert float(january["Month Return (%)"]) == pytest.approx(0.03)
+    assert float(february["Month Return (%)"]) == pytest.approx(0.026)
+    # Month return over the 30 and 27 days between the first and last prices
+    assert float(january["APR (%)"]) == pytest.approx(0.03 * 365 / 30)
+    assert float(february["APR (%)"]) == pytest.approx(0.026 * 365 / 27)
+    assert float(january["Max Drawdown (%)"]) == 0
+    assert float(february["Max Drawdown (%)"]) == pytest.approx(-0.1)
+    # The first return of February is the one from the last price of January
+    prices = list(PRICES.values())
+    assert float(january["Volatility (%)"]) == pytest.approx(get_volatility(prices[:3]))
+    assert float(february["Volatility (%)"]) == pytest.approx(
+        get_volatility(prices[2:])
+    )
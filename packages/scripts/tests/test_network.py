@@ -0,0 +1,137 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import pytest
+import requests
+from helpers import network
+from helpers.cassette import get_cassette
+from helpers.http_cache import HTTPCache
+from requests.adapters import BaseAdapter
+
+URL = "https://ydaemon.yearn.finance/1/vaults/all"
+
+
+class StubRevalidatingServer(BaseAdapter):
+    """Answers with `etag`, then a bodyless 304 to requests sending it back"""
+
+    def __init__(self):
+        super().__init__()
+        self.etag: Optional[str] = '"v1"'
+        self.requests: list[requests.PreparedRequest] = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        if self.etag and request.headers.get("If-None-Match") == self.etag:
+            response.status_code = 304
+            response._content = b""
+        else:
+            response.status_code = 200
+            response.headers["Content-Type"] = "application/json"
+            if self.etag:
+                response.headers["ETag"] = self.etag
+            response._content = json.dumps([{"symbol": "yvDAI"}]).encode()
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def server(tmp_path: Path, monkeypatch):
+    monkeypatch.delenv("CASSETTE_MODE", raising=False)
+    get_cassette.cache_clear()
+    monkeypatch.setattr(network, "http_cache", HTTPCache(tmp_path / "http"))
+    server = StubRevalidatingServer()
+    network.session.mount(URL, server)
+    yield server
+    del network.session.adapters[URL]
+
+
+def test_stored_response_is_revalidated(server: StubRevalidatingServer):
+    first = network.client("get", URL)
+    second = network.client("get", URL)
+
+    assert "If-None-Match" not in server.requests[0].headers
+    assert server.requests[1].headers["If-None-Match"] == '"v1"'
+    assert second.status_code == 200
+    assert second.json() == first.json() == [{"symbol": "yvDAI"}]
+
+
+def test_response_without_validators_is_not_stored(server: StubRevalidatingServer):
+    server.etag = None
+    network.client("get", URL)
+    second = network.client("get", URL)
+
+    assert ["If-None-Match" in i.headers for i in server.requests] == [False, False]
+    assert second.json() == [{"symbol": "yvDAI"}]
+
+
+def call_together(fn: Callable[[str], Any], callers: int = 8) -> list[Any]:
+    """Result or error of each caller, all calling `fn` with the same key at once"""
+    barrier = threading.Barrier(callers)
+
+    def call(_) -> Any:
+        barrier.wait()
+        try:
+            return fn("key")
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        return list(executor.map(call, range(callers)))
+
+
+def test_concurrent_calls_share_a_single_call():
+    calls = []
+
+    @network.single_flight()
+    def fetch(key: str) -> list[str]:
+        calls.append(key)
+        time.sleep(0.2)
+        return [key]
+
+    results = call_together(fetch)
+
+    assert calls == ["key"]
+    assert results == [["key"]] * 8
+    # Callers share the result itself
+    assert all(i is results[0] for i in results)
+
+
+def test_error_reaches_every_caller():
+    calls = []
+
+    @network.single_flight()
+    def fetch(key: str) -> list[str]:
+        calls.append(key)
+        time.sleep(0.2)
+        raise ValueError(f"Failed to fetch {key}")
+
+    errors = call_together(fetch)
+
+    assert calls == ["key"]
+    assert all(isinstance(i, ValueError) and i is errors[0] for i in errors)
+
+
+def test_key_is_released_once_the_call_is_over():
+    calls = []
+
+    @network.single_flight()
+    def fetch(key: str) -> str:
+        calls.append(key)
+        if len(calls) == 1:
+            raise ValueError(f"Failed to fetch {key}")
+        return key
+
+    with pytest.raises(ValueError):
+        fetch("key")
+    assert fetch("key") == "key"
+    assert fetch("key") == "key"
+    assert calls == ["key"] * 3
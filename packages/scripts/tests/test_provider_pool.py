@@ -0,0 +1,103 @@
+import time
+
+import pytest
+from helpers import provider_pool
+from helpers.provider_pool import ProviderPool, RateLimitedError
+from web3 import Web3
+
+
+def answer(result):
+    return lambda method, params: {"result": result}
+
+
+def fail(method, params):
+    raise ConnectionError("Endpoint is down")
+
+
+def test_fails_over_to_the_next_endpoint(stub_rpc):
+    down = stub_rpc(fail)
+    up = stub_rpc(answer("0x1"))
+    pool = ProviderPool([down.url, up.url])
+
+    assert pool.make_request("eth_blockNumber", [])["result"] == "0x1"
+    assert [i.url for i in pool.ranked()] == [up.url, down.url]
+
+
+def test_single_endpoint_is_retried_after_a_connection_error(stub_rpc):
+    failures = [ConnectionError("Endpoint restarts")]
+
+    def restart(method, params):
+        if failures:
+            raise failures.pop()
+        return {"result": "0x1"}
+
+    endpoint = stub_rpc(restart)
+    pool = ProviderPool([endpoint.url])
+
+    assert pool.make_request("eth_blockNumber", [])["result"] == "0x1"
+    assert endpoint.calls == ["eth_blockNumber", "eth_blockNumber"]
+
+
+def test_rate_limited_endpoint_is_skipped(stub_rpc):
+    limited = stub_rpc(
+        lambda method, params: {
+            "error": {
+                "code": -32005,
+                "message": "daily request count exceeded, request rate limited",
+            }
+        }
+    )
+    up = stub_rpc(answer("0x1"))
+    pool = ProviderPool([limited.url, up.url])
+
+    assert pool.make_request("eth_blockNumber", [])["result"] == "0x1"
+    with pytest.raises(RateLimitedError):
+        ProviderPool([limited.url]).make_request("eth_blockNumber", [])
+
+
+def test_other_errors_reach_web3(stub_rpc):
+    """Log queries rely on web3's ValueError to split their block range"""
+    too_many_results = stub_rpc(
+        lambda method, params: {
+            "error": {
+                "code": -32005,
+                "message": "query returned more than 10000 results",
+            }
+        }
+    )
+    other = stub_rpc(answer([]))
+    w3 = Web3(ProviderPool([too_many_results.url, other.url]))
+
+    with pytest.raises(ValueError):
+        w3.eth.get_logs({"fromBlock": 0, "toBlock": 100})
+    assert other.calls == []
+
+
+def test_failed_endpoint_is_tried_again_once_its_penalty_decays(stub_rpc, monkeypatch):
+    monkeypatch.setattr(provider_pool, "RPC_PENALTY_HALF_LIFE", 0.05)
+    is_down = True
+    fast = stub_rpc(
+        lambda method, params: fail(method, params) if is_down else {"result": "0x1"}
+    )
+    slow = stub_rpc(answer("0x2"), delay=0.05)
+    pool = ProviderPool([fast.url, slow.url])
+
+    # A single failure sends the next requests to the slow endpoint
+    assert pool.make_request("eth_blockNumber", [])["result"] == "0x2"
+    assert pool.make_request("eth_blockNumber", [])["result"] == "0x2"
+    assert len(fast.calls) == 1
+
+    is_down = False
+    time.sleep(1)
+    assert pool.make_request("eth_blockNumber", [])["result"] == "0x1"
+    assert pool.ranked()[0].url == fast.url
+
+
+def test_hedged_request_is_answered_by_the_faster_endpoint(stub_rpc):
+    slow = stub_rpc(answer("0x1"), delay=1)
+    fast = stub_rpc(answer("0x2"))
+    pool = ProviderPool([slow.url, fast.url], hedge=True)
+
+    start = time.monotonic()
+    assert pool.make_request("eth_blockNumber", [])["result"] == "0x2"
+    assert time.monotonic() - start < 0.8